@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+
+LINE_ITEM_TAG = b"IncludedSupplyChainTradeLineItem>"
+
+
+class Rejected(Exception):
+    """Request wird nicht angenommen: `status` 429 (Warteschlange voll) oder 503 (Wartezeit überschritten)."""
+
+    def __init__(self, pool, status, retry_after):
+        super().__init__(f"{pool}: {status}")
+        self.pool = pool
+        self.status = status
+        self.retry_after = retry_after
+
+
+def count_line_items(data):
+    """Positionen grob aus den Rohbytes zählen (Start- und End-Tag enthalten den Namen je einmal)."""
+    return data.count(LINE_ITEM_TAG) // 2
+
+
+def inspect_upload(file_path, is_pdf):
+    """
+    Billige Vorab-Kennzahlen einer Datei ohne XML-Parse: Größe, Anzahl PDF-Objekte (xref)
+    und Positionen im (eingebetteten) XML.
+    """
+    stats = {"kind": "pdf" if is_pdf else "xml", "bytes": os.path.getsize(file_path), "xrefs": 0, "line_items": 0}
+    if is_pdf:
+        import fitz  # PyMuPDF
+        try:
+            with fitz.open(file_path) as doc:
+                stats["xrefs"] = doc.xref_length()
+                if doc.embfile_count():
+                    stats["line_items"] = count_line_items(doc.embfile_get(0))
+        except Exception:
+            pass  # defekte PDFs meldet die Pipeline selbst
+    else:
+        with open(file_path, "rb") as f:
+            stats["line_items"] = count_line_items(f.read())
+    return stats
+
+
+def estimate_ms(stats, settings):
+    """
+    Geschätzte Laufzeit in ms aus den Kennzahlen und der Validierungsstufe (VALIDATION_MODES).
+    Faktoren grob aus `python -m benchmarks run` (EN16931, 10 – 2000 Positionen).
+    """
+    mb = stats["bytes"] / 1e6
+    cost = 5 + 20 * mb
+    if stats["kind"] == "pdf":
+        cost += 10 + 5 * mb
+    if settings["codelists"]:
+        cost += 0.4 * stats["line_items"]
+    if settings["schematron"]:
+        cost += 50 + 0.5 * stats["line_items"]
+    if settings["forensic"]:
+        cost += 0.05 * stats["xrefs"]
+    return cost
+
+
+def settings_from_env(env=None):
+    """
+    Pool-Einstellungen aus den SOVALIDATOR_*-Variablen: {"cheap": (parallel, queue, timeout),
+    "expensive": (...), "expensive_ms": ...}. Wird von app.get_admission() und gunicorn.conf.py
+    gelesen, damit die Thread-Zahl der Worker zu den Pools passt.
+    """
+    env = (os.environ if env is None else env).get
+    return {
+        "cheap": (int(env("SOVALIDATOR_CHEAP_CONCURRENCY", "4")), int(env("SOVALIDATOR_CHEAP_QUEUE", "16")),
+                  float(env("SOVALIDATOR_CHEAP_TIMEOUT", "10"))),
+        "expensive": (int(env("SOVALIDATOR_EXPENSIVE_CONCURRENCY", "1")), int(env("SOVALIDATOR_EXPENSIVE_QUEUE", "2")),
+                      float(env("SOVALIDATOR_EXPENSIVE_TIMEOUT", "30"))),
+        "expensive_ms": float(env("SOVALIDATOR_EXPENSIVE_MS", "250")),
+    }
+
+
+def request_threads(settings, spare=4):
+    """
+    Threads je Worker, damit Abweisungen überhaupt möglich sind: alle Plätze (parallel + wartend)
+    beider Pools plus `spare` für einen weiteren Request, der dann 429 bekommt, sowie /metrics,
+    Job-Status und SSE-Streams. Mit weniger Threads staut gunicorn die Requests vor der App,
+    und die Pools sehen die Last nie.
+    """
+    return sum(settings[name][0] + settings[name][1] for name in ("cheap", "expensive")) + spare
+
+
+class Pool:
+    """Begrenzte Parallelität plus begrenzte Warteschlange; Dauer-Mittelwert (EWMA) für Retry-After."""
+
+    def __init__(self, name, concurrency, max_queue, queue_timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self.rejected = {429: 0, 503: 0}
+        self.avg_seconds = 1.0
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        # Zeit, bis die aktuelle Warteschlange voraussichtlich abgearbeitet ist (mind. 1 s)
+        return max(1, int(self.avg_seconds * (self.waiting + 1) / self.concurrency + 0.5))
+
+    def acquire(self):
+        with self._cond:
+            if self.running < self.concurrency:
+                self.running += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected[429] += 1
+                raise Rejected(self.name, 429, self.retry_after())
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self.running < self.concurrency, self.queue_timeout):
+                    self.rejected[503] += 1
+                    raise Rejected(self.name, 503, self.retry_after())
+                self.running += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, seconds):
+        with self._cond:
+            self.running -= 1
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return {"running": self.running, "waiting": self.waiting, "concurrency": self.concurrency,
+                    "max_queue": self.max_queue, "rejected": dict(self.rejected)}
+
+
+class AdmissionController:
+    """
+    Teilt Requests nach geschätzten Kosten in zwei Pools ("cheap"/"expensive") mit eigener
+    Parallelität und Warteschlange, damit teure Prüfungen (große PDFs, Schematron, forensische
+    Scans) die vielen kleinen nicht aushungern. Gilt pro Prozess.
+    """
+
+    def __init__(self, cheap=(4, 16, 10.0), expensive=(1, 2, 30.0), expensive_ms=250):
+        self.pools = {"cheap": Pool("cheap", *cheap), "expensive": Pool("expensive", *expensive)}
+        self.expensive_ms = expensive_ms
+
+    def classify(self, cost_ms):
+        return "expensive" if cost_ms >= self.expensive_ms else "cheap"
+
+    def admit(self, pool_name):
+        """Kontextmanager; wirft Rejected, wenn der Pool voll ist."""
+        return _Admission(self.pools[pool_name])
+
+    def snapshot(self):
+        return {name: pool.snapshot() for name, pool in self.pools.items()}
+
+
+class _Admission:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        self.pool.acquire()
+        self._t0 = time.perf_counter()
+        return self.pool
+
+    def __exit__(self, *exc):
+        self.pool.release(time.perf_counter() - self._t0)
+        return False
@@ -1,18 +1,37 @@
-from flask import Flask, render_template, request, send_file, session
+from flask import Blueprint, Flask, Response, abort, current_app, g, jsonify, render_template, request, send_file, session, stream_template, url_for
 from markupsafe import Markup
 from category_code_tools import replace_category_codes
+from element_whitelist import find_nonstandard_elements, load_whitelists
+from error_rules import RuleContext, run_rules
+from format_router import (
+    SYNTAX_CII, SYNTAX_UBL_INVOICE, classify_syntax, describe_syntax, sniff_root
+)
 import zipfile
-import fitz  # PyMuPDF
 import tempfile
 from lxml import etree
 import os
 import re
-import pandas as pd
 from difflib import get_close_matches
 import sys
 import xml.etree.ElementTree as ET
 import re
 import hashlib
+import time
+import gc
+import json
+import secrets
+import logging
+import admission
+import compression
+import documents
+import jobs
+import jsonlog
+import metrics
+import profiling
+import result_store
+import sqlite3
+
+log = logging.getLogger(jsonlog.LOGGER_NAME)
 
 def replace_category_codes(xml_str, replacements):
     """
@@ -62,7 +81,7 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=40)
             rel_end = m.end()
             new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
             new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-            print(f"[Window-Replace] <{tagname}>{old_value}</{tagname}> → <{tagname}>{new_value}</{tagname}> (mit Prefix: {prefix})")
+            log.debug("Window-Replace: Wert ersetzt", extra={"tag": tagname, "old": old_value, "new": new_value, "prefix": prefix})
             return new_xml
 
     # Leeres Tag ersetzen
@@ -73,7 +92,7 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=40)
         rel_end = m.end()
         new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
         new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-        print(f"[Window-Replace] Leeres <{tagname}></{tagname}> → <{tagname}>{new_value}</{tagname}> (mit Prefix: {prefix})")
+        log.debug("Window-Replace: leeres Tag gefüllt", extra={"tag": tagname, "old": old_value, "new": new_value, "prefix": prefix})
         return new_xml
 
     # Self-closing Tag ersetzen
@@ -84,19 +103,22 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=40)
         rel_end = m.end()
         new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
         new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-        print(f"[Window-Replace] Selfclose <{tagname}/> → <{tagname}>{new_value}</{tagname}> (mit Prefix: {prefix})")
+        log.debug("Window-Replace: Selfclose-Tag gefüllt", extra={"tag": tagname, "old": old_value, "new": new_value, "prefix": prefix})
         return new_xml
 
-    print(f"[Window-Replace] Kein Treffer für <{tagname}> ({old_value!r}) im Fenster.")
+    log.debug("Window-Replace: kein Treffer im Fenster", extra={"tag": tagname, "old": old_value, "position": position})
     return xml
 
+ENTITY_AMP_RE = re.compile(r'&(?!(?:amp|lt|gt|quot|apos|#[0-9]+|#x[0-9a-fA-F]+);)')
+
 def xml_escape_values(xml):
     """
     Ersetzt in allen XML-Elementwerten die Zeichen &, <, >, ", ' durch die korrekten Entities.
+    Vorhandene Entities (&amp;, &#228; ...) bleiben unverändert, zweimal escapen schadet also nicht.
     """
     def escape_match(match):
         value = match.group(1)
-        value = (value.replace('&', '&amp;')
+        value = (ENTITY_AMP_RE.sub('&amp;', value)
                       .replace('<', '&lt;')
                       .replace('>', '&gt;')
                       .replace('"', '&quot;')
@@ -118,7 +140,7 @@ def replace_all_tag_values(xml, replacements):
         def repl(m):
             return f"{m.group(1)}{new}{m.group(3)}"
         xml, count = re.subn(pattern, repl, xml)
-        print(f"Ersetze <{tag}>{old}</{tag}> → <{tag}>{new}</{tag}>: {count} mal ersetzt.")
+        log.debug("Tag-Werte ersetzt", extra={"tag": tag, "old": old, "new": new, "count": count})
     return xml
 
 def replace_value_in_window(xml, position, tag, old_value, new_value, window=30):
@@ -154,7 +176,7 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=30)
             rel_end = m.end()
             new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
             new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-            print(f"[Window-Replace] <{tagname}>{old_value}</{tagname}> → <{tagname}>{new_value}</{tagname}> (mit Prefix: {prefix})")
+            log.debug("Window-Replace: Wert ersetzt", extra={"tag": tagname, "old": old_value, "new": new_value, "prefix": prefix})
             return new_xml
     # Falls altwert leer oder vorher nicht gefunden: leeres Tag ersetzen
     m = pattern_empty.search(snippet)
@@ -164,7 +186,7 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=30)
         rel_end = m.end()
         new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
         new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-        print(f"[Window-Replace] Leeres <{tagname}></{tagname}> → <{tagname}>{new_value}</{tagname}> (mit Prefix: {prefix})")
+        log.debug("Window-Replace: leeres Tag gefüllt", extra={"tag": tagname, "old": old_value, "new": new_value, "prefix": prefix})
         return new_xml
     # Oder self-closing
     m = pattern_selfclose.search(snippet)
@@ -174,15 +196,15 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=30)
         rel_end = m.end()
         new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
         new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-        print(f"[Window-Replace] Selfclose <{tagname}/> → <{tagname}>{new_value}</{tagname}> (mit Prefix: {prefix})")
+        log.debug("Window-Replace: Selfclose-Tag gefüllt", extra={"tag": tagname, "old": old_value, "new": new_value, "prefix": prefix})
         return new_xml
 
-    print(f"[Window-Replace] Nichts ersetzt für <{tagname}> ({old_value!r}) im Kontext!")
+    log.debug("Window-Replace: kein Treffer im Fenster", extra={"tag": tagname, "old": old_value, "position": position})
     return xml
 
 
 def replace_all_empty_tags(xml, corrections):
-    print("==> Corrections:", corrections)  # <-- HIER!
+    log.debug("Leere Tags füllen", extra={"corrections": len(corrections)})
     for corr in corrections:
         # Korrektur als String
         if isinstance(corr, str):
@@ -213,7 +235,7 @@ def replace_all_empty_tags(xml, corrections):
             prefix = m.group(1) or ''
             return f"<{prefix}{tag}>{value}</{prefix}{tag}>"
         xml, c2 = re.subn(pattern2, repl2, xml)
-        print(f"Ersetze <...:{tag}> leer: {c1+c2} mal ersetzt.")
+        log.debug("Leere Tags gefüllt", extra={"tag": tag, "new": value, "count": c1 + c2})
     return xml
 
 
@@ -222,15 +244,12 @@ def replace_at_positions(xml, corrections):
     """
     Ersetzt die angegebenen Zeichenbereiche durch die neuen Werte (von hinten nach vorne!).
     """
-    print("--- XML vor Korrekturen (repr, 1000 Zeichen): ---")
-    print(repr(xml[:1000]))
     corr_list = []
     for c in corrections:
         parts = c.split("|")
         if len(parts) == 4:
             label, start, end, new_value = parts
             start, end = int(start), int(end)
-            print(f"Korrektur: {label} {start}:{end} → '{xml[start:end]}' → '{new_value}'")
             corr_list.append((start, end, new_value))
 
     # Von hinten nach vorne sortieren, damit Indexe nach vorne unverändert bleiben!
@@ -238,10 +257,8 @@ def replace_at_positions(xml, corrections):
 
     xml_str = xml
     for start, end, new_value in corr_list:
-        print(f"Ersetze [{start}:{end}] '{xml_str[start:end]}' → '{new_value}'")
+        log.debug("Positionskorrektur", extra={"start": start, "end": end, "old": xml_str[start:end], "new": new_value})
         xml_str = xml_str[:start] + new_value + xml_str[end:]
-    print("--- XML nach Korrekturen (repr, 1000 Zeichen): ---")
-    print(repr(xml_str[:1000]))
     return xml_str
 
 def replace_nth_tag_value(xml, tag, old, new, n):
@@ -251,24 +268,24 @@ def replace_nth_tag_value(xml, tag, old, new, n):
     pattern = fr'(<{tag}>)({re.escape(old)})(</{tag}>)'
     matches = list(re.finditer(pattern, xml))
     if len(matches) < n:
-        print(f"WARN: {n}. Vorkommen von <{tag}>{old}</{tag}> nicht gefunden!")
+        log.warning("n-tes Vorkommen nicht gefunden", extra={"tag": tag, "old": old, "n": n})
         return xml
     m = matches[n-1]
     start, end = m.start(2), m.end(2)
     xml_new = xml[:start] + new + xml[end:]
-    print(f"Ersetze das {n}. <{tag}>{old}</{tag}> zu <{tag}>{new}</{tag}>")
+    log.debug("n-tes Vorkommen ersetzt", extra={"tag": tag, "old": old, "new": new, "n": n})
     return xml_new
 
     # Index des n-ten Vorkommens
     match = matches[n-1]
     start, end = match.start(2), match.end(2)
     before = xml[max(0, start-50):end+50]
-    print(f"Vor Ersetzung #{n}: {before}")
+    log.debug("Vor Ersetzung", extra={"n": n, "context": before})
 
     # Ersetze genau das n-te Vorkommen
     corrected_xml = xml[:start] + new + xml[end:]
     after = corrected_xml[max(0, start-50):start+len(new)+50]
-    print(f"Nach Ersetzung #{n}: {after}")
+    log.debug("Nach Ersetzung", extra={"n": n, "context": after})
 
     return corrected_xml
     
@@ -280,6 +297,8 @@ if hasattr(sys, '_MEIPASS'):
     DEFAULT_XSLT_PATH = os.path.join(base_path, 'EN16931-CII-validation.xslt')
     EXCEL_PATH = os.path.join(base_path, 'static', 'data', '4. EN16931+FacturX code lists values v14 - used from 2024-11-15.xlsx')
     DEFAULT_XSD_ROOT = os.path.join(base_path, 'ZF232_DE', 'Schema')
+    DEFAULT_UBL_XSD_PATH = os.path.join(base_path, 'UBL-XSD', 'UBL-Invoice-2.1.xsd')
+    CACHE_DIR = os.environ.get("SOVALIDATOR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sovalidator"))
 else:
     base_path = os.path.abspath(".")
     template_folder = "templates"
@@ -287,10 +306,14 @@ else:
     DEFAULT_XSLT_PATH = "EN16931-CII-validation.xslt"
     EXCEL_PATH = os.path.join("static", "data", "4. EN16931+FacturX code lists values v14 - used from 2024-11-15.xlsx")
     DEFAULT_XSD_ROOT = os.path.join("ZF232_DE", "Schema")
+    DEFAULT_UBL_XSD_PATH = os.path.join("UBL-XSD", "UBL-Invoice-2.1.xsd")
+    CACHE_DIR = os.environ.get("SOVALIDATOR_CACHE_DIR", ".cache")
+
+# Codelisten-Version aus dem Dateinamen der Excel-Datei, z.B. "v14 (2024-11-15)"
+_codelist_match = re.search(r"values (v\d+) - used from ([\d-]+)", os.path.basename(EXCEL_PATH))
+CODELIST_VERSION = f"{_codelist_match.group(1)} ({_codelist_match.group(2)})" if _codelist_match else os.path.basename(EXCEL_PATH)
 
-app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
-app.secret_key = "supergeheimer-schlüssel"
-app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
+bp = Blueprint("validator", __name__)
 
 MANDATORY_TAGS = [
     "ram:ID", "ram:IssueDateTime", "ram:SellerTradeParty", "ram:BuyerTradeParty",
@@ -298,6 +321,54 @@ MANDATORY_TAGS = [
     "ram:CountryID", "ram:InvoiceCurrencyCode", "ram:LineID", "ram:TypeCode"
 ]
 
+# Validierungsstufen (Web-Formular und API, Parameter "mode").
+# Jede Stufe bricht beim ersten fatalen Fehler ab (keine XML, kein CII-Root,
+# nicht wohlgeformt). budget_ms ist das Latenzbudget pro Dokument (<1 MB XML).
+VALIDATION_MODES = {
+    # Root-Tag, Wohlgeformtheit, Profil-XSD, E0051 Anhang/Dateiname
+    "quick": {"codelists": False, "schematron": False, "forensic": False, "budget_ms": 100},
+    # + Codelisten, PDF-Version/XMP, E0053/E0054/E0070
+    "standard": {"codelists": True, "schematron": False, "forensic": False, "budget_ms": 500},
+    # + Schematron, forensische PDF-Scans (alle xref-Streams, Roh-XML-Suche)
+    "full": {"codelists": True, "schematron": True, "forensic": True, "budget_ms": 5000},
+}
+DEFAULT_VALIDATION_MODE = "standard"
+
+CII_NAMESPACES = {
+    "rsm": "urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100",
+    "ram": "urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100",
+    "udt": "urn:un:unece:uncefact:data:standard:UnqualifiedDataType:100",
+    "qdt": "urn:un:unece:uncefact:data:standard:QualifiedDataType:100",
+}
+
+# Profilkennung (GuidelineSpecifiedDocumentContextParameter) → XSD-Profil.
+# Reihenfolge ist relevant: "basicwl" enthält "basic".
+PROFILE_MARKERS = [
+    ("extended", "EXTENDED"),
+    ("basicwl", "BASICWL"),
+    ("basic", "BASIC"),
+    ("minimum", "MINIMUM"),
+    ("urn:cen.eu:en16931:2017", "EN16931"),
+]
+
+CODELIST_PATTERNS = {
+    "Currency": [r"<ram:InvoiceCurrencyCode>(.*?)</ram:InvoiceCurrencyCode>"],
+    "Country": [r"<ram:CountryID>(.*?)</ram:CountryID>"],
+    "Payment": [r"<ram:SpecifiedTradeSettlementPaymentMeans>.*?<ram:TypeCode>(.*?)</ram:TypeCode>"],
+    "VAT CAT": [r"<ram:ApplicableTradeTax>.*?<ram:TypeCode>(.*?)</ram:TypeCode>"],
+    "5305": [r"<ram:CategoryCode>(.*?)</ram:CategoryCode>"],
+    "1153": [r"<ram:ReferenceTypeCode>(.*?)</ram:ReferenceTypeCode>"],
+    "Date": [r'DateTimeString[^>]*?format="(.*?)"'],
+    "Line Status": [r"<ram:LineStatusCode>(.*?)</ram:LineStatusCode>"],
+    "INCOTERMS": [r"<ram:INCOTERMSCode>(.*?)</ram:INCOTERMSCode>"],
+    "TRANSPORT": [r"<ram:TransportModeCode>(.*?)</ram:TransportModeCode>"],
+    "1001": [r"<rsm:ExchangedDocument>.*?<ram:TypeCode>(.*?)</ram:TypeCode>"],
+    "Unit": [
+        r'<ram:BilledQuantity[^>]*?unitCode="(.*?)"',
+        r'<ram:InvoicedQuantity[^>]*?unitCode="(.*?)"'
+    ]
+}
+
 codelists = {
     "Country": "Alpha-2 code",
     "Currency": "Alphabetic Code",
@@ -327,16 +398,58 @@ codelists = {
     "Filename": "Code",
     "HybridVersion": "Code",
 }
-code_sets = {}
+_code_sets = None
 
-for sheet, column in codelists.items():
+def load_code_sets(excel_path, cache_dir):
+    """
+    Codelisten aus der Excel-Datei lesen (27 Sheets, pandas nur hier).
+
+    Das Ergebnis wird als JSON in `cache_dir` abgelegt und bei unveränderter Excel-Datei
+    von dort geladen; so braucht ein Neustart weder pandas noch openpyxl.
+    """
     try:
-        df = pd.read_excel(EXCEL_PATH, sheet_name=sheet, engine="openpyxl")
-        df.columns = df.columns.str.strip()
-        values = df[column].dropna().astype(str).str.strip().unique()
-        code_sets[sheet] = set(values)
-    except Exception:
-        code_sets[sheet] = set()
+        stat = os.stat(excel_path)
+        fingerprint = f"{os.path.basename(excel_path)}|{stat.st_size}|{stat.st_mtime_ns}|{sorted(codelists.items())}"
+    except OSError:
+        fingerprint = None
+    cache_path = os.path.join(cache_dir, "code_sets.json")
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if fingerprint and cached.get("fingerprint") == fingerprint:
+            return {sheet: set(values) for sheet, values in cached["code_sets"].items()}
+    except (OSError, ValueError):
+        pass
+
+    import pandas as pd
+    code_sets = {}
+    for sheet, column in codelists.items():
+        try:
+            df = pd.read_excel(excel_path, sheet_name=sheet, engine="openpyxl")
+            df.columns = df.columns.str.strip()
+            values = df[column].dropna().astype(str).str.strip().unique()
+            code_sets[sheet] = set(values)
+        except Exception:
+            code_sets[sheet] = set()
+    if fingerprint:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint,
+                           "code_sets": {k: sorted(v) for k, v in code_sets.items()}}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # Cache ist optional
+    return code_sets
+
+def get_code_sets():
+    """Codelisten (einmal pro Prozess geladen, siehe warm_up())."""
+    global _code_sets
+    metrics.record_cache("code_sets", _code_sets is not None)
+    if _code_sets is None:
+        _code_sets = load_code_sets(EXCEL_PATH, CACHE_DIR)
+    return _code_sets
 
 def escape_all_text(xml):
     # Parst die XML, escapt Text- und Tail-Inhalte, serialisiert zurück
@@ -363,93 +476,98 @@ def escape_all_text(xml):
     recurse(root)
     return ET.tostring(root, encoding="unicode")
 
-def check_errorcodes(xml, file_path):
-    reasons = []
-    allowed_xml_names = [
-        "ZUGFeRD-invoice.xml", "zugferd-invoice.xml", "factur-x.xml", "xrechnung.xml"
-    ]
-    # --- E0051: PDF-Prüfungen ohne VeraPDF ---
+def inspect_pdf(file_path, mode="full"):
+    """
+    PDF-Daten für die E0051-Regeln sammeln.
+
+    ``quick`` liest nur die Anhänge, ``standard`` zusätzlich PDF-Version und XMP-Kennung,
+    ``full`` scannt außerdem alle Objekte forensisch nach einer PDF/A-3-Kennung.
+    """
+    info = {"error": None, "embfile_count": 0, "embedded_name": None,
+            "pdf_version": None, "pdfa3_hint": False, "custom_xmp": False}
+    import fitz  # PyMuPDF
     try:
         doc = fitz.open(file_path)
-        # 1. Keine eingebettete XML?
-        if doc.embfile_count() == 0:
-            reasons.append("E0051: PDF enthält keine eingebettete Rechnung (weder XML, noch irgendetwas anderes).")
-        # 2. PDF-Version prüfen
-        pdf_version = None
+        info["embfile_count"] = doc.embfile_count()
+        if info["embfile_count"] > 0:
+            info["embedded_name"] = doc.embfile_info(0).get("filename", "")
+        if mode == "quick":
+            return info
         if hasattr(doc, "pdf_version"):
-            pdf_version = doc.pdf_version
+            info["pdf_version"] = doc.pdf_version
         else:
             meta = doc.metadata or {}
-            pdf_version = meta.get("pdf:PDFVersion") or meta.get("format")
-        if not pdf_version or "1.7" not in str(pdf_version):
-            reasons.append(f"E0051: PDF hat PDF-Version: ({pdf_version}). Bei FACTUR-X sagt die Norm 1.7")
+            info["pdf_version"] = meta.get("pdf:PDFVersion") or meta.get("format")
 
-        # 3. PDF/A-3-Kennung in Metadaten (nicht rechtssicher!)
+        # PDF/A-3-Kennung in Metadaten (nicht rechtssicher!)
         meta_str = str(doc.metadata)
-        pdfa3_hint = False
-        if "/PDF/A-3" in meta_str or "/pdfaid:part>3<" in meta_str:
-            pdfa3_hint = True
-        for xref in range(1, doc.xref_length()):
+        pdfa3_hint = "/PDF/A-3" in meta_str or "/pdfaid:part>3<" in meta_str
+        if not pdfa3_hint:
+            # XMP-Stream des Katalogs direkt lesen (ein Objekt statt aller xrefs)
             try:
-                stream = doc.xref_stream(xref)
-                if b'PDF/A-3' in stream or b'pdfaid:part>3<' in stream:
-                    pdfa3_hint = True
-                    break
+                xmp = doc.get_xml_metadata() or ""
             except Exception:
-                pass
+                xmp = ""
+            pdfa3_hint = "pdfaid:part>3<" in xmp or 'pdfaid:part="3"' in xmp or "PDF/A-3" in xmp
+        if not pdfa3_hint and VALIDATION_MODES[mode]["forensic"]:
+            for xref in range(1, doc.xref_length()):
+                try:
+                    stream = doc.xref_stream(xref)
+                    if b'PDF/A-3' in stream or b'pdfaid:part>3<' in stream:
+                        pdfa3_hint = True
+                        break
+                except Exception:
+                    pass
+        info["pdfa3_hint"] = pdfa3_hint
         if not pdfa3_hint:
-            if check_custom_xmp(file_path):
-                pass  # Kein Fehler, da Custom-XMP vorhanden!
-            else:
-                reasons.append("E0051: PDF scheint kein PDF/A-3 zu sein (Metadatenprüfung, unsicher).")
-        # 4. Embedded-XML-Filename prüfen
-        if doc.embfile_count() > 0:
-            emb_name = doc.embfile_info(0).get("filename", "")
-            if emb_name not in allowed_xml_names:
-                reasons.append(
-                    "E0051: Filename der eingebetteten Rechnung ist nicht korrekt. "
-                    f"Gefunden: {emb_name}, erlaubt: {', '.join(allowed_xml_names)}"
-                )
+            info["custom_xmp"] = check_custom_xmp(file_path)
     except Exception as e:
-        reasons.append(f"E0051: PDF konnte nicht geprüft werden. ({e})")
-    # --- E0070: Rechnungsnummer/Charge auf Preisebene ---
+        info["error"] = str(e)
+    return info
+
+def find_errorcodes(xml, file_path, mode="full", doc=None, parse_error=None, parse=True):
+    """
+    SON-Fehlercodes über die Regeln aus error_rules ermitteln.
+
+    :param file_path: PDF-Datei für die E0051-Regeln (None bei reinen XML-Uploads)
+    :param doc: bereits geparstes XML (spart einen weiteren Parser-Lauf)
+    :param parse_error: Parserfehler, falls der Aufrufer schon erfolglos geparst hat
+    :param parse: False = nicht selbst parsen (Ablehnung schon nach dem Root-Sniff); Elementregeln entfallen
+    :return: Liste von Dicts (code, severity, message)
+    """
+    ctx = RuleContext(xml=xml, doc=doc, parse_error=parse_error)
     if xml is not None:
-        if not re.search(r"<ram:ID>\s*\S+\s*</ram:ID>", xml):
-            reasons.append("E0070: Fehlende Rechnungsnummer im Dokument.")
-        if re.search(r"<ram:GrossPrice>.*?<ram:Charge>.*?</ram:Charge>.*?</ram:GrossPrice>", xml, re.DOTALL):
-            reasons.append("E0070: Charge auf Preisebene (unter GrossPrice) gefunden.")
-        # --- E0053: XML/Format-Prüfung ---
-        try:
-            etree.fromstring(xml.encode("utf-8"))
-        except Exception:
-            reasons.append("E0053: Invalides XML.")
-        # XRechnung-Format
-        if not re.search(r"<rsm:CrossIndustryInvoice", xml):
-            reasons.append("E0053: Ungültiges XRechnungs-Format (Root-Tag fehlt).")
-        # Prüfe auf UBL/PEPPOL nur am Root-Tag!
-        if re.search(r'<Invoice[^>]+xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"', xml):
-            reasons.append("E0053: PEPPOL UBL-Format erkannt (nicht zulässig für XRechnung/Factur-X-Workflow).")
-        # --- E0054: Nach Extraktion kein XML ---
-        try:
-            etree.fromstring(xml.encode("utf-8"))
-        except Exception:
-            reasons.append("E0054: Extrahiertes Objekt ist keine als XML klassifizierbare Datei (z.B. fehlendes End-Tag).")
-    return reasons
+        ctx.syntax = classify_syntax(xml)
+        if parse and doc is None and parse_error is None:
+            try:
+                ctx.doc = etree.fromstring(xml.encode("utf-8"))
+            except etree.XMLSyntaxError as e:
+                ctx.parse_error = str(e)
+    if file_path is not None:
+        ctx.pdf = inspect_pdf(file_path, mode)
+    return run_rules(ctx, mode)
+
+def check_errorcodes(xml, file_path, mode="full", doc=None):
+    """SON-Fehlercodes (E0051/E0053/E0054/E0070) als Liste von Meldungen."""
+    return [finding["message"] for finding in find_errorcodes(xml, file_path, mode, doc)]
 
 def extract_xml_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
+    import fitz  # PyMuPDF
+    with metrics.span("pdf_open"):
+        doc = fitz.open(pdf_path)
     for i in range(doc.embfile_count()):
         name = doc.embfile_info(i).get("filename", "").lower()
         if name.endswith(".xml"):
             xml_bytes = doc.embfile_get(i)
-            return xml_bytes.decode("utf-8", errors="replace")
+            return xml_bytes.decode("utf-8-sig", errors="replace")
     if doc.embfile_count() > 0:
         xml_bytes = doc.embfile_get(0)
-        return xml_bytes.decode("utf-8", errors="replace")
+        return xml_bytes.decode("utf-8-sig", errors="replace")
     return None
 
 def extract_raw_xml_from_pdf(pdf_path):
     """Suche im gesamten PDF nach Roh-XML-Streams (forensisch, kein offizieller Anhang)."""
+    import fitz  # PyMuPDF
     doc = fitz.open(pdf_path)
     for xref in range(1, doc.xref_length()):
         try:
@@ -468,6 +586,7 @@ def extract_raw_xml_from_pdf(pdf_path):
     return None, None
 
 def check_custom_xmp(pdf_path):
+    import fitz  # PyMuPDF
     doc = fitz.open(pdf_path)
     xmp = doc.metadata.get("xmp")
     if not xmp:
@@ -551,11 +670,93 @@ def validate_against_all_xsds(xml, schema_root):
                 results.append(str(e))
     return False, "❌ XML entspricht keiner XSD:<br>" + "<br>".join(results)
 
+def detect_seller(doc):
+    """
+    Kennung des Verkäufers: USt-ID, sonst GlobalID, sonst ID, sonst Name von ram:SellerTradeParty (oder None).
+    Ergebnis mit Präfix ("VA:DE123456789", "0088:4000001000005", "ID:4711", "NAME:Muster GmbH").
+    """
+    party = doc.find(
+        "rsm:SupplyChainTradeTransaction/ram:ApplicableHeaderTradeAgreement/ram:SellerTradeParty", CII_NAMESPACES
+    )
+    if party is None:
+        return None
+    for path, prefix in (("ram:SpecifiedTaxRegistration/ram:ID[@schemeID='VA']", "VA"),
+                         ("ram:GlobalID", None), ("ram:ID", "ID"), ("ram:Name", "NAME")):
+        element = party.find(path, CII_NAMESPACES)
+        if element is not None and (element.text or "").strip():
+            return f"{prefix or element.get('schemeID', 'GLOBAL')}:{element.text.strip()}"
+    return None
+
+def detect_profile(doc):
+    """Factur-X/ZUGFeRD-Profil aus ram:GuidelineSpecifiedDocumentContextParameter (oder None)."""
+    ids = doc.xpath(
+        "/rsm:CrossIndustryInvoice/rsm:ExchangedDocumentContext"
+        "/ram:GuidelineSpecifiedDocumentContextParameter/ram:ID/text()",
+        namespaces=CII_NAMESPACES,
+    )
+    guideline = ids[0].strip().lower() if ids else ""
+    for marker, profile in PROFILE_MARKERS:
+        if marker in guideline:
+            return profile
+    return None
+
+def profile_xsd_path(schema_root, profile):
+    """Pfad des Haupt-XSD eines Profils (z.B. .../Factur-X_1.07.2_EN16931.xsd) oder None."""
+    suffix = f"_{profile}.xsd"
+    return next((p for p in list_all_xsd_files(schema_root) if p.endswith(suffix)), None)
+
+_xsd_cache = {}
+
+def get_profile_schema(schema_root, profile):
+    """Kompiliertes Haupt-XSD eines Profils (einmal pro Prozess geladen)."""
+    key = (schema_root, profile)
+    metrics.record_cache("xsd", key in _xsd_cache)
+    if key not in _xsd_cache:
+        xsd_path = profile_xsd_path(schema_root, profile)
+        schema = etree.XMLSchema(etree.parse(xsd_path)) if xsd_path else None
+        _xsd_cache[key] = (xsd_path, schema)
+    return _xsd_cache[key]
+
+_element_whitelists = None
+
+def get_element_whitelists():
+    """Erlaubte Elementpfade je Profil (aus den XSDs, auf Platte gecacht) für "Nicht-standardisierte Tags"."""
+    global _element_whitelists
+    if _element_whitelists is None:
+        _element_whitelists = load_whitelists(
+            {profile: profile_xsd_path(DEFAULT_XSD_ROOT, profile) for _, profile in PROFILE_MARKERS},
+            CACHE_DIR,
+        )
+    return _element_whitelists
+
+def validate_against_profile_xsd(doc, xml, schema_root, profile):
+    """Nur gegen das XSD des erkannten Profils prüfen; ohne Profil alle XSDs durchprobieren."""
+    xsd_path, schema = get_profile_schema(schema_root, profile) if profile else (None, None)
+    if schema is None:
+        return validate_against_all_xsds(xml, schema_root)
+    if schema.validate(doc):
+        return True, f"✔️ XML entspricht dem XSD ({os.path.basename(xsd_path)})."
+    errors = "<br>".join(f"Zeile {e.line}: {e.message}" for e in schema.error_log)
+    return False, f"❌ XML entspricht nicht dem XSD ({os.path.basename(xsd_path)}):<br>{errors}"
+
+_xslt_cache = {}
+
+def get_schematron_transform(xslt_path):
+    """Kompiliertes Schematron-XSLT (einmal pro Prozess). Kompilierfehler werden mitgecacht."""
+    metrics.record_cache("schematron", xslt_path in _xslt_cache)
+    if xslt_path not in _xslt_cache:
+        try:
+            _xslt_cache[xslt_path] = etree.XSLT(etree.parse(xslt_path))
+        except Exception as e:
+            _xslt_cache[xslt_path] = e
+    return _xslt_cache[xslt_path]
+
 def validate_with_schematron(xml, xslt_path):
     try:
         xml_doc = etree.fromstring(xml.encode("utf-8"))
-        xslt_doc = etree.parse(xslt_path)
-        transform = etree.XSLT(xslt_doc)
+        transform = get_schematron_transform(xslt_path)
+        if isinstance(transform, Exception):
+            raise transform
         svrl = transform(xml_doc)
         failed = svrl.xpath("//svrl:failed-assert", namespaces={"svrl": "http://purl.oclc.org/dsdl/svrl"})
         return [fa.find("svrl:text", namespaces={"svrl": "http://purl.oclc.org/dsdl/svrl"}).text for fa in failed]
@@ -565,16 +766,8 @@ def validate_with_schematron(xml, xslt_path):
 def detect_xml_standard(xml):
     if xml is None:
         return "Unbekannt"
-    # UBL-2.1/2.2/2.3 (Invoice-2)
-    if re.search(r'<Invoice[^>]+xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"', xml):
-        return "UBL Invoice-2"
-    # XRechnung/Factur-X/CII
-    if re.search(r'<rsm:CrossIndustryInvoice', xml):
-        return "CII (CrossIndustryInvoice – z.B. XRechnung, Factur-X, ZUGFeRD)"
-    # PEPPOL Hinweis
-    if "peppol" in xml.lower():
-        return "PEPPOL UBL"
-    return "Unbekannt"
+    # Nur Prolog + Root-Tag lesen (UBL Invoice/CreditNote, CII, sonst PEPPOL-Hinweis im Kopf)
+    return describe_syntax(classify_syntax(xml), xml)
 
 def replace_value_in_window(xml, position, tag, old_value, new_value, window=30):
     """
@@ -607,47 +800,301 @@ def replace_value_in_window(xml, position, tag, old_value, new_value, window=30)
             prefix = m.group(1) or m.group(2) or ''
             new_tag = f"<{prefix}{tagname}>{new_value}</{prefix}{tagname}>"
             new_xml = xml[:start] + snippet[:rel_start] + new_tag + snippet[rel_end:] + xml[end:]
-            print(f"Ersetze im Fenster <{tag}> ({old_value!r}): {new_tag}")
+            log.debug("Window-Replace: ersetzt", extra={"tag": tag, "old": old_value, "new": new_value})
             return new_xml
-    print(f"Kein zu ersetzendes <{tag}> mit Wert '{old_value}' oder leer im Kontext gefunden!")
+    log.debug("Window-Replace: kein Treffer im Fenster", extra={"tag": tag, "old": old_value, "position": position})
     return xml
 
-@app.route("/correct_xml", methods=["POST"])
-def correct_xml_endpoint():
-    data = request.get_json()
-    xml_str = data["xml"]
-    replacements = data["replacements"]  # [{"index": x, "new_value": y}, ...]
-    result_xml = replace_category_codes(xml_str, replacements)
-    return result_xml, 200, {'Content-Type': 'application/xml'}
+def suggest_code(label, value, allowed_set):
+    """
+    Wahrscheinlichsten Codelisten-Wert für einen ungültigen Wert vorschlagen (oder None).
+    Unabhängig von der Reihenfolge des Sets (PYTHONHASHSEED), damit Reports reproduzierbar sind.
+    """
+    # 1. Längster Prefix-Match (z.B. "58ggg" => "58" statt "5" bei Payment)
+    prefixes = [option for option in sorted(allowed_set) if value and value.startswith(option)]
+    if prefixes:
+        return max(prefixes, key=len)
+    # 2. Korrekturvorschlags-Logik
+    if label == "5305" and value and value.upper() != value and value.upper() in allowed_set:
+        return value.upper()
+    closest_match = get_close_matches(value, sorted(allowed_set), n=1, cutoff=0.6)
+    return closest_match[0] if closest_match else None
+
+def check_codelists(xml):
+    """
+    Prüft alle Werte aus CODELIST_PATTERNS gegen die EN16931-Codelisten.
 
-@app.route("/download_corrected", methods=["POST"])
-def download_corrected():
-    if request.is_json:
-        data = request.get_json()
-        corrections = data.get("corrections", [])
-        replacements = data.get("replacements", [])
-        original_xml = data.get("xml")
+    :return: Liste von Dicts (label, value, line, column, start, end, suggestion), nach Position sortiert
+    """
+    findings = []
+    for label, patterns in CODELIST_PATTERNS.items():
+        allowed_set = get_code_sets().get(label, set())
+        for pattern in patterns:
+            for match in re.finditer(pattern, xml):
+                value = match.group(1).strip() if match.lastindex and match.group(1) else ""
+                if value != "" and value in allowed_set:
+                    continue
+                start = match.start(1) if match.lastindex else match.start()
+                end = match.end(1) if match.lastindex else match.end()
+                findings.append({
+                    "label": label,
+                    "value": value,
+                    "line": xml.count("\n", 0, start) + 1,
+                    "column": start - (xml.rfind("\n", 0, start) + 1) + 1,
+                    "start": start,
+                    "end": end,
+                    "suggestion": suggest_code(label, value, allowed_set) if allowed_set else None,
+                })
+    findings.sort(key=lambda x: (x["line"], x["column"]))
+    return findings
+
+def resolve_validation_mode(mode, schematron=False):
+    """Validierungsstufe aus Formular/API bestimmen; die alte Schematron-Checkbox bedeutet "full"."""
+    mode = (mode or "").strip().lower()
+    if mode not in VALIDATION_MODES:
+        mode = "full" if schematron else DEFAULT_VALIDATION_MODE
+    return mode
+
+def save_upload(uploaded):
+    """Upload in eine temporäre Datei schreiben. Rückgabe: (file_path, is_pdf, sha256)."""
+    file_ext = os.path.splitext(uploaded.filename)[1].lower()
+    is_pdf = file_ext == ".pdf"
+    is_xml = file_ext == ".xml" or uploaded.content_type in ["application/xml", "text/xml"]
+    tmp_suffix = file_ext if is_pdf or is_xml else ".bin"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=tmp_suffix) as tmp:
+        file_path = tmp.name
+        uploaded.save(file_path)
+    sha256 = file_sha256(file_path)
+    metrics.annotate(invoice_sha256=sha256)
+    return file_path, is_pdf, sha256
+
+def file_sha256(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def get_ubl_schema():
+    """UBL-Schema (einmal pro Prozess); None, solange nur der Platzhalter unter UBL-XSD liegt."""
+    if "UBL" not in _xsd_cache:
+        try:
+            schema = etree.XMLSchema(etree.parse(DEFAULT_UBL_XSD_PATH))
+        except (OSError, etree.XMLSyntaxError, etree.XMLSchemaParseError):
+            schema = None
+        _xsd_cache["UBL"] = (DEFAULT_UBL_XSD_PATH, schema)
+    return _xsd_cache["UBL"][1]
+
+def validate_non_cii(xml, syntax, report, file_path=None, mode=DEFAULT_VALIDATION_MODE):
+    """
+    Kette für Nicht-CII-Dokumente: UBL gegen das UBL-XSD (falls vorhanden), alles andere ablehnen.
+    Die Fehlercodes (E0053/E0054, bei PDFs E0051) kommen in jedem Fall aus den Regeln; ohne UBL-XSD
+    wird das Dokument dafür nicht geparst (Ablehnung nach dem Root-Sniff bleibt billig).
+
+    :param file_path: PDF-Datei für die E0051-Regeln (None bei reinen XML-Uploads)
+    :return: Name der fatalen Stufe ("root", "well_formed") oder None, wenn das UBL-XSD geprüft wurde
+    """
+    schema = get_ubl_schema() if syntax == SYNTAX_UBL_INVOICE else None
+    doc = parse_error = fatal = None
+    if schema is None:
+        report["messages"].append(
+            f"❌ Kein CII-Rechnungsdokument (erkannt: {report['xml_standard']}). Weitere Prüfungen übersprungen."
+        )
+        fatal = "root"
+        # Kein vollständiger Parse des abgelehnten Dokuments: nur wenn schon das Root-Element
+        # nicht lesbar ist, gilt es als invalides XML
+        if sniff_root(xml) is None:
+            parse_error = "Root-Element nicht lesbar"
     else:
-        corrections = request.form.getlist("corrections")
-        import json
         try:
-            replacements = json.loads(request.form.get("replacements", "[]"))
-        except Exception:
-            replacements = []
-        original_xml = request.form.get("xml_data") or request.form.get("xml")
-    if not original_xml:
-        return "❌ Kein XML übertragen! Bitte prüfe das Formular.", 400
+            doc = etree.fromstring(xml.encode("utf-8"))
+        except etree.XMLSyntaxError as e:
+            parse_error = str(e)
+            report["syntax_errors"].append(f"⚠️ Strukturfehler: {e}")
+            fatal = "well_formed"
+        else:
+            report["well_formed"] = True
+            report["xsd_ok"] = schema.validate(doc)
+            report["messages"].append(
+                "✔️ XML entspricht dem UBL-XSD." if report["xsd_ok"]
+                else "❌ XML entspricht nicht dem UBL-XSD:<br>" + "<br>".join(e.message for e in schema.error_log)
+            )
+    with metrics.span("errorcodes"):
+        set_error_findings(report, find_errorcodes(xml, file_path, mode, doc, parse_error, parse=fatal != "root"))
+    return fatal
 
-    # ab hier: KEIN data.get mehr!
-    corrected_xml = replace_category_codes(original_xml, replacements)
-    import io, zipfile
+def count_line_items(doc):
+    """Anzahl ram:IncludedSupplyChainTradeLineItem (für Metriken und Kostenschätzung)."""
+    return sum(1 for _ in doc.iter(f"{{{CII_NAMESPACES['ram']}}}IncludedSupplyChainTradeLineItem"))
 
-    original_pdf_path = session.get("original_pdf_path")
-    if not original_pdf_path or not os.path.exists(original_pdf_path):
-        return "❌ Originale PDF nicht gefunden.", 400
+def set_error_findings(report, findings):
+    report["error_findings"] = findings
+    report["error_reasons"] = [f["message"] for f in findings]
 
-    # Korrekturen: Standard (|3) und Positionskorrekturen (|4)
+def run_validation(file_path, is_pdf, mode=DEFAULT_VALIDATION_MODE, nonstandard=False, progress=None):
+    """
+    Validierungspipeline für eine hochgeladene PDF/XML-Datei.
+
+    Die Stufe (siehe VALIDATION_MODES) bestimmt, welche Prüfungen laufen; `nonstandard`
+    meldet zusätzlich Elemente, die im XSD des erkannten Profils nicht vorkommen.
+    Bei einem fatalen Fehler wird abgebrochen und ``report["fatal"]`` gesetzt.
+    `progress(stage, report)` wird, falls angegeben, nach jeder abgeschlossenen Prüfung aufgerufen
+    (Zwischenstand für Jobs/SSE).
+
+    :return: Report-Dict (für Template und JSON-API)
+    """
+    settings = VALIDATION_MODES[mode]
+    t0 = time.perf_counter()
+    metrics.annotate(mode=mode)
+    report = {
+        "mode": mode,
+        "xml": None,
+        "raw_xml": None,
+        "syntax": None,
+        "xml_standard": None,
+        "profile": None,
+        "fatal": None,
+        "well_formed": False,
+        "xsd_ok": False,
+        "messages": [],
+        "syntax_errors": [],
+        "schematron": [],
+        "codelist_errors": [],
+        "nonstandard_elements": [],
+        "error_reasons": [],
+        "error_findings": [],
+        "line_items": None,
+        "seller_id": None,
+    }
+
+    def finish(fatal=None):
+        report["fatal"] = fatal
+        report["accepted"] = (
+            fatal is None and report["xsd_ok"]
+            and not any(f["severity"] == "error" for f in report["error_findings"])
+            and not (report["codelist_errors"] or report["schematron"])
+        )
+        report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        report["budget_ms"] = settings["budget_ms"]
+        return report
+
+    def stage_done(stage):
+        if progress:
+            progress(stage, report)
+
+    # XML aus PDF extrahieren oder direkt einlesen
+    if is_pdf:
+        with metrics.span("xml_extraction"):
+            xml = extract_xml_from_pdf(file_path)
+        if not xml:
+            if settings["forensic"]:
+                # Forensisch nach Roh-XML suchen!
+                with metrics.span("raw_xml_scan"):
+                    raw_xml, xref_no = extract_raw_xml_from_pdf(file_path)
+                if raw_xml:
+                    report["raw_xml"] = raw_xml
+                    report["messages"].append(
+                        "❌ Keine korrekt eingebettete XML-Datei in der PDF gefunden.<br>"
+                        "🕵️‍♂️ <b>Aber:</b> Im PDF wurde eine Roh-XML im Objekt gefunden (nicht offiziell eingebettet).<br>"
+                    )
+                    return finish("extraction")
+            report["messages"].append("❌ Keine XML-Datei in der PDF gefunden.")
+            with metrics.span("errorcodes"):
+                set_error_findings(report, find_errorcodes(None, file_path, mode))
+            return finish("extraction")
+    else:
+        with metrics.span("xml_extraction"), open(file_path, "rb") as f:
+            # utf-8-sig: ein BOM am Anfang gehört nicht zum Dokument (sonst kein erkennbares Root-Element)
+            xml = f.read().decode("utf-8-sig", errors="replace")
+    report["xml"] = xml
+    metrics.annotate(document_bytes=len(xml.encode("utf-8")))
+    stage_done("extraction")
+
+    # 1. Root-Element → Validator-Kette der Syntax
+    syntax = classify_syntax(xml)
+    report["syntax"] = syntax
+    report["xml_standard"] = describe_syntax(syntax, xml)
+    if syntax != SYNTAX_CII:
+        return finish(validate_non_cii(xml, syntax, report, file_path if is_pdf else None, mode))
+
+    # 2. Wohlgeformtheit
+    with metrics.span("well_formed"):
+        valid, msg, excerpt, highlight_line, xml_suggestions = validate_xml(xml)
+    report["messages"].append(msg)
+    report["syntax_errors"] = xml_suggestions or []
+    if not valid:
+        # Fehlercodes trotzdem: E0053/E0054 aus dem Parserfehler, E0051 aus der PDF
+        with metrics.span("errorcodes"):
+            set_error_findings(report, find_errorcodes(xml, file_path if is_pdf else None, mode))
+        return finish("well_formed")
+    report["well_formed"] = True
+    stage_done("well_formed")
+
+    # 3. XSD des erkannten Profils
+    with metrics.span("parse"):
+        doc = etree.fromstring(xml.encode("utf-8"))
+        report["profile"] = detect_profile(doc)
+        report["line_items"] = count_line_items(doc)
+        report["seller_id"] = detect_seller(doc)
+    metrics.annotate(profile=report["profile"], line_items=report["line_items"])
+    with metrics.span("xsd"):
+        xsd_ok, xsd_msg = validate_against_profile_xsd(doc, xml, DEFAULT_XSD_ROOT, report["profile"])
+    report["xsd_ok"] = xsd_ok
+    report["messages"].append(xsd_msg)
+    stage_done("xsd")
+    if nonstandard and report["profile"] in get_element_whitelists():
+        with metrics.span("nonstandard"):
+            report["nonstandard_elements"] = find_nonstandard_elements(
+                doc, get_element_whitelists()[report["profile"]], {ns: prefix for prefix, ns in CII_NAMESPACES.items()}
+            )
+        stage_done("nonstandard")
+
+    # 4. Codelisten
+    if settings["codelists"]:
+        with metrics.span("codelists"):
+            report["codelist_errors"] = check_codelists(xml)
+        stage_done("codelists")
+
+    # 5. Schematron
+    if settings["schematron"] and os.path.exists(DEFAULT_XSLT_PATH):
+        with metrics.span("schematron"):
+            report["schematron"] = validate_with_schematron(xml, DEFAULT_XSLT_PATH)
+        stage_done("schematron")
+
+    # 6. Fehlercode-Prüfung
+    with metrics.span("errorcodes"):
+        set_error_findings(report, find_errorcodes(xml, file_path if is_pdf else None, mode, doc))
+    return finish()
+
+def apply_corrections(xml, corrections, replacements=()):
+    """
+    Korrekturen aus dem Formular auf das XML anwenden.
+
+    :param corrections: Strings "Tag|alt|neu" oder Positionskorrekturen "Label|start|ende|neu"
+        (bei Codelisten-Labels aus CODELIST_PATTERNS ersetzt die Positionskorrektur genau xml[start:ende])
+    :param replacements: CategoryCode-Ersetzungen nach Index (siehe replace_category_codes)
+    :return: Korrigiertes XML als String
+    """
+    corrected_xml = xml
+    # Codelisten-Funde (check_codelists) beziehen sich auf Positionen im Original-XML:
+    # vor allen anderen Änderungen und von hinten nach vorne ersetzen, damit die Positionen stimmen
+    spans, remaining = [], []
     for corr in corrections:
+        parts = [p.strip() for p in corr.split("|")]
+        if len(parts) == 4 and parts[0] in CODELIST_PATTERNS and parts[1].isdigit() and parts[2].isdigit():
+            spans.append((int(parts[1]), int(parts[2]), parts[3]))
+        else:
+            remaining.append(corr)
+    for start, end, new_value in sorted(spans, reverse=True):
+        if start <= end <= len(corrected_xml) and new_value:
+            corrected_xml = corrected_xml[:start] + new_value + corrected_xml[end:]
+
+    # Nur bei Index-Ersetzungen neu serialisieren (ElementTree vergibt sonst ns0/ns1-Präfixe)
+    if replacements:
+        corrected_xml = replace_category_codes(corrected_xml, replacements)
+
+    # Korrekturen: Standard (|3) und Positionskorrekturen (|4)
+    for corr in remaining:
         parts = [p.strip() for p in corr.split("|")]
         if len(parts) == 4:
             # Positionskorrektur wie bisher
@@ -672,10 +1119,7 @@ def download_corrected():
                         )
                         found = True
                         break
-                print("Prüfe Tag:", tag, "| old:", old_value, "| new:", new_value)
-                print("Gefunden im XML:")
-                for m in regex.finditer(corrected_xml):
-                    print(f"  Wert: {m.group(2)} | start: {m.start(2)}")
+                log.debug("Korrektur Tag|alt|neu", extra={"tag": tag, "old": old_value, "new": new_value, "found": found})
                 if not found and old_value == "":
                     # Self-closing Tag (<ram:XYZ/>)
                     regex2 = re.compile(fr"<([a-zA-Z0-9]+:)?{tagname}\s*/>")
@@ -699,85 +1143,102 @@ def download_corrected():
             )
         # Sonst ignorieren
 
-    print("KORRIGIERTES XML (direkt vor Einbettung):")
-    print(corrected_xml)
-    print("MD5:", hashlib.md5(corrected_xml.encode('utf-8')).hexdigest())
-
-    # Jetzt escapen
-    corrected_xml = xml_escape_values(corrected_xml)
-    print("KORRIGIERTES XML (direkt vor Einbettung):")
-    print(corrected_xml)
-    print("MD5:", hashlib.md5(corrected_xml.encode('utf-8')).hexdigest())
-    # === Zusätzliche Logs zur Ursachenforschung ===
-    print("Nach replace_at_positions:")
-    print("  [1744:1745]:", repr(corrected_xml[1744:1745]))
-    print("  [4313:4314]:", repr(corrected_xml[4313:4314]))
-    for m in re.finditer(r"<ram:CategoryCode>(.*?)</ram:CategoryCode>", corrected_xml):
-        print(f"{m.start(1)}:{m.end(1)} = '{m.group(1)}'")
-    
-    print("---- Kontrolle der Zeichen an den Korrektur-Positionen ----")
-    for c in corrections:
-        parts = c.split("|")
-        if len(parts) == 4:
-            label, start, end, new_value = parts
-            start, end = int(start), int(end)
-            snippet = corrected_xml[start-10:end+10]  # Kontext drum herum
-            print(f"Korrektur {label}: Position {start}:{end} → vor Korrektur: '{xml_raw[start:end]}' | nach Korrektur: '{corrected_xml[start:end]}' | Kontext: '{snippet}'")
+    return corrected_xml
 
-    print("---- CategoryCode-Übersicht (Positionen & Werte im gesamten XML) ----")
-    for m in re.finditer(r"<ram:CategoryCode>(.*?)</ram:CategoryCode>", corrected_xml):
-        print(f"CategoryCode bei [{m.start(1)}:{m.end(1)}] = '{m.group(1)}'")
-    print("-------------------------------------------------------------")
-    print("XML nach Korrektur:", corrected_xml[:1000])
+def embed_xml_in_pdf(pdf_path, xml, out_path):
+    """Alle Anhänge der PDF durch `xml` als factur-x.xml ersetzen und nach `out_path` speichern."""
+    import fitz  # PyMuPDF
+    doc = fitz.open(pdf_path)
+    while doc.embfile_count() > 0:
+        doc.embfile_del(0)
+    doc.embfile_add("factur-x.xml", xml.encode("utf-8"))
+    doc.save(out_path)
+    doc.close()
 
-    # 2. Dann escapen
+def write_corrected_pdf(pdf_path, original_xml, corrections, out_path, replacements=(), embed_raw=False):
+    """
+    Korrekturen anwenden, Werte escapen und das XML als factur-x.xml in eine Kopie der PDF einbetten
+    (Download im Web-UI und Hot-Folder). Rückgabe: das eingebettete XML, oder None (keine PDF
+    geschrieben), wenn Korrekturen übergeben wurden, aber keine etwas geändert hat. Mit `embed_raw`
+    (Roh-XML aus der PDF, "PDF reparieren") wird auch unverändertes XML eingebettet.
+    """
+    with metrics.span("correction"):
+        corrected_xml = apply_corrections(original_xml, corrections, replacements)
+    if corrected_xml == original_xml and (corrections or replacements) and not embed_raw:
+        log.info("Keine Korrektur anwendbar, keine PDF geschrieben", extra={"corrections": len(corrections)})
+        return None
+
+    if log.isEnabledFor(logging.DEBUG):
+        for c in corrections:
+            parts = c.split("|")
+            if len(parts) == 4:
+                label, start, end, new_value = parts
+                start, end = int(start), int(end)
+                log.debug("Positionskorrektur geprüft", extra={
+                    "label": label, "start": start, "end": end, "new": new_value,
+                    "before": original_xml[start:end], "after": corrected_xml[start:end],
+                })
+
+    # Eingesetzte Werte escapen (vorhandene Entities bleiben)
     corrected_xml = xml_escape_values(corrected_xml)
 
-    corrected_pdf_path = tempfile.mktemp(suffix=".pdf")
-    doc = fitz.open(original_pdf_path)
-    print("PDF Embedded Files (vorher):", doc.embfile_count())
-    for i in range(doc.embfile_count()):
-        print(doc.embfile_info(i))
-    print("Vorherige Embfile-Infos:")
-    for i in range(doc.embfile_count()):
-        print(doc.embfile_info(i))
+    with metrics.span("reembed"):
+        embed_xml_in_pdf(pdf_path, corrected_xml, out_path)
 
-    while doc.embfile_count() > 0:
-        doc.embfile_del(0)
+    if log.isEnabledFor(logging.DEBUG):
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as doc_before, fitz.open(out_path) as doc_after:
+            log.debug("Anhänge ersetzt", extra={
+                "before": [doc_before.embfile_info(i)["filename"] for i in range(doc_before.embfile_count())],
+                "after": [doc_after.embfile_info(i)["filename"] for i in range(doc_after.embfile_count())],
+            })
 
-    with open("/tmp/corrected_xml_debug.xml", "w", encoding="utf-8") as f:
-        f.write(corrected_xml)
-    print("Bonus-Check: corrected_xml wurde nach /tmp/corrected_xml_debug.xml geschrieben.")
+    return corrected_xml
 
-    doc.embfile_add("factur-x.xml", corrected_xml.encode("utf-8"))
+@bp.route("/correct_xml", methods=["POST"])
+def correct_xml_endpoint():
+    data = request.get_json()
+    xml_str = data["xml"]
+    replacements = data["replacements"]  # [{"index": x, "new_value": y}, ...]
+    result_xml = replace_category_codes(xml_str, replacements)
+    return result_xml, 200, {'Content-Type': 'application/xml'}
 
-    print("Nachherige Embfile-Infos:")
-    for i in range(doc.embfile_count()):
-        print(doc.embfile_info(i))
+@bp.route("/download_corrected", methods=["POST"])
+def download_corrected():
+    if request.is_json:
+        data = request.get_json()
+        corrections = data.get("corrections", [])
+        replacements = data.get("replacements", [])
+        handle = data.get("doc")
+        original_xml = data.get("xml")
+    else:
+        corrections = request.form.getlist("corrections")
+        try:
+            replacements = json.loads(request.form.get("replacements", "[]"))
+        except Exception:
+            replacements = []
+        handle = request.form.get("doc")
+        original_xml = request.form.get("xml_data") or request.form.get("xml")
+    # Dokument-Handle aus dem Formular; ältere Clients schicken das XML noch selbst mit
+    document = document_store().get(handle or session.get("document"))
+    if not original_xml and document:
+        original_xml = document["xml"]
+    if not original_xml:
+        return "❌ Kein XML übertragen! Bitte prüfe das Formular.", 400
 
-    doc.save(corrected_pdf_path)
-    doc.close()
+    import io, zipfile
 
-    with fitz.open(corrected_pdf_path) as check_doc:
-        print(">>> PDF Embedded Files (nachher):")
-        for i in range(check_doc.embfile_count()):
-            info = check_doc.embfile_info(i)
-            print(info)
-            xml_bytes = check_doc.embfile_get(i)
-            preview = xml_bytes[:200].decode("utf-8", errors="replace")
-            print("== Embedded XML-Preview ==", preview)
-        try:
-            xml_str = xml_bytes.decode("utf-8", errors="replace")
-            print("KategorieCode NACH Extraktion aus PDF (direkt nach embfile_get):")
-            for m in re.finditer(r"<ram:CategoryCode>(.*?)</ram:CategoryCode>", xml_str):
-                print(f"CategoryCode [{m.start(1)}:{m.end(1)}] = '{m.group(1)}'")
-            print("--- extrahiertes XML ---")
-            print(xml_str[1720:1760])
-        except Exception as e:
-            print("Fehler beim XML-Preview:", e)
+    original_pdf_path = document["upload_path"] if document else None
+    if not original_pdf_path or not os.path.exists(original_pdf_path):
+        return "❌ Originale PDF nicht gefunden.", 400
 
+    corrected_pdf_path = tempfile.mktemp(suffix=".pdf")
+    corrected_xml = write_corrected_pdf(original_pdf_path, original_xml, corrections, corrected_pdf_path, replacements,
+                                        embed_raw=bool(document and document["raw"]))
+    if corrected_xml is None:
+        return "❌ Keine Korrektur anwendbar, die Rechnung bleibt unverändert.", 400
 
-    orig_filename = session.get("uploaded_filename")
+    orig_filename = document["filename"] or session.get("uploaded_filename")
     if not orig_filename:
         orig_filename = "Rechnung"
     basename, ext = os.path.splitext(orig_filename)
@@ -787,9 +1248,13 @@ def download_corrected():
     with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
         with open(corrected_pdf_path, "rb") as f:
             pdf_bytes = f.read()
-            print("MD5 vom endgültigen PDF:", hashlib.md5(pdf_bytes).hexdigest())
             zf.writestr(download_name, pdf_bytes)
     zip_buffer.seek(0)
+    if log.isEnabledFor(logging.INFO):
+        log.info("Korrigierte PDF erzeugt", extra={
+            "corrections": len(corrections), "replacements": len(replacements),
+            "xml": jsonlog.payload(corrected_xml), "pdf": jsonlog.payload(pdf_bytes),
+        })
 
     return send_file(
         zip_buffer,
@@ -798,196 +1263,622 @@ def download_corrected():
         download_name=f"{basename}_corrected.zip"
     )
     
-@app.route("/", methods=["GET", "POST"])
+@bp.route("/", methods=["GET", "POST"])
 def index():
-    result = ""
     filename = ""
-    excerpt = []
-    highlight_line = None
     suggestions = []
     codelist_table = []
-    syntax_table = []
-    error_reasons = []
 
     uploaded = request.files.get("pdf_file")
     if not uploaded or uploaded.filename == "":
         result = "❌ Keine Datei ausgewählt oder hochgeladen."
-        return render_template("index.html", result=result, filename=filename)
+        return render_template("index.html", result=result, filename=filename, modes=VALIDATION_MODES)
 
     filename = uploaded.filename
     session["uploaded_filename"] = filename
-    file_ext = os.path.splitext(filename)[1].lower()
-    is_pdf = file_ext == ".pdf"
-    is_xml = file_ext == ".xml" or uploaded.content_type in ["application/xml", "text/xml"]
+    file_path, is_pdf, sha256 = save_upload(uploaded)
 
-    tmp_suffix = file_ext if is_pdf or is_xml else ".bin"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=tmp_suffix) as tmp:
-        file_path = tmp.name
-        uploaded.save(file_path)
+    mode = resolve_validation_mode(request.form.get("mode"), request.form.get("schematron"))
+    try:
+        with admit_upload(file_path, is_pdf, mode):
+            report = run_validation(file_path, is_pdf, mode, nonstandard=bool(request.form.get("nonstandard")))
+    except admission.Rejected as e:
+        os.remove(file_path)
+        result = f"⏳ Server ausgelastet, bitte in {e.retry_after} Sekunden erneut versuchen."
+        return (render_template("index.html", result=result, filename=filename, modes=VALIDATION_MODES, mode=mode),
+                e.status, {"Retry-After": str(e.retry_after)})
+    record_result(report, sha256, "web")
+
+    # Upload und XML bleiben serverseitig liegen; die Formulare tragen nur den Handle
+    document_xml = report["xml"] or report["raw_xml"]
+    if document_xml:
+        handle = document_store().put(file_path, document_xml, filename, raw=report["xml"] is None)
+        session["document"] = handle
+    else:
+        handle = None
+        os.remove(file_path)
+    result = ["<br>".join(report["messages"])]
+
+    if report["raw_xml"]:
+        # Option für den User: Sollen wir das PDF automatisch „reparieren“ (richtig einbetten)?
+        # Correction Proposal als Dropdown!
+        repair_dropdown = (
+            '<form method="POST" action="/download_corrected">'
+            f'<input type="hidden" name="doc" value="{handle}">'
+            '<input type="hidden" name="correction" value="EMBEDRAW|noembed|embed">'
+            '<label>PDF reparieren (XML korrekt als Anhang einbetten)? '
+            '<select name="repair_embed">'
+            '<option value="yes" selected>Ja, reparieren</option>'
+            '<option value="no">Nein, PDF bleibt wie sie ist</option>'
+            '</select></label> '
+            '<button type="submit">📥 Korrigierte PDF herunterladen</button>'
+            '</form>'
+        )
+        result.append(repair_dropdown)
+        return stream_report(result="".join(result), filename=filename, modes=VALIDATION_MODES, mode=mode)
+
+    suggestions.extend(f"❌ {msg}" for msg in report["schematron"])
+
+    code_sets = get_code_sets()
+    for finding in report["codelist_errors"]:
+        label, value, closest = finding["label"], finding["value"], finding["suggestion"]
+        allowed_set = code_sets.get(label, set())
+        if not allowed_set:
+            dropdown_html = "⚠️ Kein Wert angegeben oder keine Codeliste verfügbar"
+        else:
+            options = "".join(
+                f'<option value="{label}|{finding["start"]}|{finding["end"]}|{option}" {"selected" if option == closest else ""}>{option}</option>'
+                for option in sorted(allowed_set)
+            )
+            dropdown_html = f'<label>→ Möglicherweise meinten Sie: <select name="corrections">{options}</select></label>'
+
+        codelist_table.append({
+            "label": label,
+            "value": value,
+            "suggestion": Markup(dropdown_html),  # wird im Template ge-„safed“
+            "line": finding["line"],
+            "column": finding["column"],
+            # entscheidend: start & end-Position des zu ersetzenden Inhalts!
+            "correction_value": f"{label}|{finding['start']}|{finding['end']}|{closest or ''}"
+        })
 
-    session["original_pdf_path"] = file_path
+    # Fehlerausgabe ans Result anhängen
+    if report["error_reasons"]:
+        title = "Fehlererkennung" if report["xml"] is None else "SON Fehlererkennung"
+        result.append(f"<br><br><b>{title}:</b><ul>")
+        result.extend(f"<li>{reason}</li>" for reason in report["error_reasons"])
+        result.append("</ul>")
+
+    return stream_report(
+        result="".join(result),
+        filename=filename,
+        excerpt=[],
+        highlight_line=None,
+        suggestion="<br>".join(suggestions),
+        syntax_table=report["syntax_errors"],
+        nonstandard_table=report["nonstandard_elements"],
+        codelist_table=codelist_table,
+        codelisten_hinweis="ℹ️ Hinweis: Codelistenprüfung basiert auf EN16931 v14 (gültig ab 2024-11-15).",
+        document=handle,
+        xml_standard=report["xml_standard"],
+        modes=VALIDATION_MODES,
+        mode=mode
+    )
 
-    try:
-        # XML aus PDF extrahieren oder direkt einlesen
-        if is_pdf:
-            xml = extract_xml_from_pdf(file_path)
-            if not xml:
-                # Forensisch nach Roh-XML suchen!
-                raw_xml, xref_no = extract_raw_xml_from_pdf(file_path)
-                if raw_xml:
-                    # Info für User!
-                    result = (
-                        "❌ Keine korrekt eingebettete XML-Datei in der PDF gefunden.<br>"
-                        "🕵️‍♂️ <b>Aber:</b> Im PDF wurde eine Roh-XML im Objekt gefunden (nicht offiziell eingebettet).<br>"
-                    )
-                    # Option für den User: Sollen wir das PDF automatisch „reparieren“ (richtig einbetten)?
-                    # Correction Proposal als Dropdown!
-                    repair_dropdown = (
-                        '<form method="POST" action="/download_corrected">'
-                        '<input type="hidden" name="xml_data" value="{}">'.format(raw_xml.replace('"', "&quot;")) +
-                        '<input type="hidden" name="correction" value="EMBEDRAW|noembed|embed">'
-                        '<label>PDF reparieren (XML korrekt als Anhang einbetten)? '
-                        '<select name="repair_embed">'
-                        '<option value="yes" selected>Ja, reparieren</option>'
-                        '<option value="no">Nein, PDF bleibt wie sie ist</option>'
-                        '</select></label> '
-                        '<button type="submit">📥 Korrigierte PDF herunterladen</button>'
-                        '</form>'
-                    )
-                    result += repair_dropdown
-                    return render_template("index.html", result=result, filename=filename)
-                else:
-                    result = "❌ Keine XML-Datei in der PDF gefunden."
-                    error_reasons = check_errorcodes(None, file_path)
-                    if error_reasons:
-                        result += "<br><br><b>Fehlererkennung:</b><ul>"
-                        for reason in error_reasons:
-                            result += f"<li>{reason}</li>"
-                        result += "</ul>"
-                    return render_template("index.html", result=result, filename=filename)
+def stream_report(**context):
+    """
+    Report-Seite mit stream_template ausliefern: der Kopf geht raus, während die (bei
+    vielen Codelisten-Fehlern sehr lange) Tabelle noch gerendert wird. Die Render-Zeit
+    landet als Stufe "render" in /metrics, im Server-Timing-Header fehlt sie deshalb.
+    """
+    return Response(metrics.timed_stream(stream_template("index.html", **context), "render"),
+                    content_type="text/html; charset=utf-8")
 
+def document_store():
+    config = current_app.config
+    return documents.DocumentStore(config["DOCUMENT_DIR"], config["DOCUMENT_TTL"])
 
-        xml_standard = detect_xml_standard(xml)
+@bp.route("/api/validate", methods=["POST"])
+def api_validate():
+    """JSON-Variante von index(): Datei im Feld "pdf_file", Stufe über "mode" (quick/standard/full)."""
+    uploaded = request.files.get("pdf_file")
+    if not uploaded or uploaded.filename == "":
+        return jsonify({"error": "Keine Datei ausgewählt oder hochgeladen."}), 400
+    mode = request.values.get("mode") or DEFAULT_VALIDATION_MODE
+    if mode not in VALIDATION_MODES:
+        return jsonify({"error": f"Unbekannte Validierungsstufe: {mode}", "modes": list(VALIDATION_MODES)}), 400
 
-        valid, msg, excerpt, highlight_line, xml_suggestions = validate_xml(xml)
-        result = msg
-        if xml_suggestions:
-            syntax_table = xml_suggestions
-
-        if valid:
-            xsd_ok, xsd_msg = validate_against_all_xsds(xml, DEFAULT_XSD_ROOT)
-            result += "<br>" + xsd_msg
-            if os.path.exists(DEFAULT_XSLT_PATH) and request.form.get("schematron"):
-                sch_issues = validate_with_schematron(xml, DEFAULT_XSLT_PATH)
-                suggestions.extend(f"❌ {msg}" for msg in sch_issues)
-    
-        xml_lines = xml.splitlines()
-        element_context_mapping = {
-            "Currency": [r"<ram:InvoiceCurrencyCode>(.*?)</ram:InvoiceCurrencyCode>"],
-            "Country": [r"<ram:CountryID>(.*?)</ram:CountryID>"],
-            "Payment": [r"<ram:SpecifiedTradeSettlementPaymentMeans>.*?<ram:TypeCode>(.*?)</ram:TypeCode>"],
-            "VAT CAT": [r"<ram:ApplicableTradeTax>.*?<ram:TypeCode>(.*?)</ram:TypeCode>"],
-            "5305": [r"<ram:CategoryCode>(.*?)</ram:CategoryCode>"],
-            "1153": [r"<ram:ReferenceTypeCode>(.*?)</ram:ReferenceTypeCode>"],
-            "Date": [r'DateTimeString[^>]*?format="(.*?)"'],
-            "Line Status": [r"<ram:LineStatusCode>(.*?)</ram:LineStatusCode>"],
-            "INCOTERMS": [r"<ram:INCOTERMSCode>(.*?)</ram:INCOTERMSCode>"],
-            "TRANSPORT": [r"<ram:TransportModeCode>(.*?)</ram:TransportModeCode>"],
-            "1001": [r"<rsm:ExchangedDocument>.*?<ram:TypeCode>(.*?)</ram:TypeCode>"],
-            "Unit": [
-                r'<ram:BilledQuantity[^>]*?unitCode="(.*?)"',
-                r'<ram:InvoicedQuantity[^>]*?unitCode="(.*?)"'
-            ]
-        }
-        for label, patterns in element_context_mapping.items():
-            allowed_set = code_sets.get(label, set())
-            value_counter = {}
-            for pattern in patterns:
-                regex = re.compile(pattern)
-                for match in regex.finditer(xml):
-                    value = match.group(1).strip() if match.lastindex and match.group(1) else ""
-                    count = value_counter.get(value, 0) + 1
-                    value_counter[value] = count
-
-                    if value == "" or value not in allowed_set:
-                        start = match.start(1) if match.lastindex else match.start()
-                        end = match.end(1) if match.lastindex else match.end()
-                
-                        line_number = xml.count("\n", 0, start) + 1
-                        offset = start - sum(len(l) + 1 for l in xml_lines[:line_number - 1])
-                        column_number = offset + 1
-                        if not allowed_set:
-                            dropdown_html = "⚠️ Kein Wert angegeben oder keine Codeliste verfügbar"
-                        else:
-                            sorted_options = sorted(allowed_set)
-                            old_value = value if value else "__LEER__"
-    
-                            # 1. Prefix-Match (z.B. "58ggg" => "58" bei Payment)
-                            prefix_match = None
-                            for option in allowed_set:
-                                if value and value.startswith(option):
-                                    prefix_match = option
-                                    break
-
-                            # 2. Korrekturvorschlags-Logik
-                            if prefix_match:
-                                closest_match = [prefix_match]
-                            elif label == "5305" and value and value.upper() != value:
-                                if value.upper() in allowed_set:
-                                    closest_match = [value.upper()]
-                                else:
-                                    closest_match = get_close_matches(value, allowed_set, n=1, cutoff=0.6)
-                            else:
-                                closest_match = get_close_matches(value, allowed_set, n=1, cutoff=0.6)
-
-                            dropdown_html = f'<label>→ Möglicherweise meinten Sie: '
-                            dropdown_html += f'<select name="corrections">'
-                            for option in sorted_options:
-                                selected = 'selected' if closest_match and option == closest_match[0] else ''
-                                dropdown_html += (
-                                    f'<option value="{label}|{value}|{option}" {selected}>{option}</option>'
-                                )
-                            dropdown_html += '</select></label>'
-
-                        suggestion = Markup(dropdown_html)
-                        codelist_table.append({
-                            "label": label,
-                            "value": value,
-                            "suggestion": suggestion,  # wird im Template ge-„safed“
-                            "line": line_number,
-                            "column": column_number,
-                            # entscheidend: start & end-Position des zu ersetzenden Inhalts!
-                            "correction_value": f"{label}|{start}|{end}|{closest_match[0] if closest_match else ''}"
-                        })
-        codelist_table.sort(key=lambda x: (x["line"], x["column"]))
-
-        # Fehlercode-Prüfung
-        error_reasons = check_errorcodes(xml, file_path)
+    file_path, is_pdf, sha256 = save_upload(uploaded)
+    try:
+        with admit_upload(file_path, is_pdf, mode):
+            report = run_validation(file_path, is_pdf, mode, nonstandard=request.values.get("nonstandard") in ("1", "true", "on"))
+    except admission.Rejected as e:
+        return (jsonify({"error": "Server ausgelastet.", "pool": e.pool, "retry_after": e.retry_after}),
+                e.status, {"Retry-After": str(e.retry_after)})
+    finally:
+        os.remove(file_path)
+    record_result(report, sha256, "api")
+    return jsonify(public_report(report, uploaded.filename))
+
+_admission = None
+
+def get_admission():
+    """Admission-Controller dieses Prozesses (Pools konfigurierbar über SOVALIDATOR_*-Variablen)."""
+    global _admission
+    if _admission is None:
+        _admission = admission.AdmissionController(**admission.settings_from_env())
+    return _admission
 
+def admit_upload(file_path, is_pdf, mode):
+    """
+    Kosten der Datei schätzen (Typ, Größe, xref-Anzahl, Positionen) und einen Platz im
+    passenden Pool belegen. Kontextmanager; wirft admission.Rejected bei vollem Pool.
+    """
+    with metrics.span("admission"):
+        stats = admission.inspect_upload(file_path, is_pdf)
+        cost_ms = admission.estimate_ms(stats, VALIDATION_MODES[mode])
+    controller = get_admission()
+    pool = controller.classify(cost_ms)
+    metrics.annotate(admission_pool=pool, estimated_ms=round(cost_ms, 1))
+    return controller.admit(pool)
+
+metrics.register(metrics.CallbackMetric(
+    "sovalidator_admission_in_flight", "Laufende bzw. wartende Validierungen je Pool.", ("pool", "state"),
+    lambda: {(pool, state): snap[state] for pool, snap in get_admission().snapshot().items()
+             for state in ("running", "waiting")},
+))
+metrics.register(metrics.CallbackMetric(
+    "sovalidator_admission_rejected_total", "Abgewiesene Validierungen je Pool und HTTP-Status.", ("pool", "status"),
+    lambda: {(pool, status): count for pool, snap in get_admission().snapshot().items()
+             for status, count in snap["rejected"].items()},
+    kind="counter",
+))
+
+def public_report(report, filename=None):
+    """Report ohne die (großen) XML-Texte für JSON-Antworten."""
+    public = {key: value for key, value in report.items() if key not in ("xml", "raw_xml")}
+    if filename is not None:
+        public["filename"] = filename
+    return public
+
+_job_queue = None
+_worker_pool = None
+
+def get_job_queue():
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = jobs.JobQueue(
+            os.environ.get("SOVALIDATOR_JOBS_DB", os.path.join(CACHE_DIR, "jobs.sqlite3")),
+            ttl=int(os.environ.get("SOVALIDATOR_JOB_TTL", "3600")),
+        )
+    return _job_queue
+
+def get_worker_pool():
+    """Job-Worker dieses Prozesses (SOVALIDATOR_JOB_WORKERS Threads, Start beim ersten Zugriff)."""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = jobs.WorkerPool(
+            get_job_queue(), run_job, size=int(os.environ.get("SOVALIDATOR_JOB_WORKERS", "2")),
+            on_error=lambda job, e: log.error("Job fehlgeschlagen", exc_info=e,
+                                              extra={"job_id": job and job["id"]}),
+        )
+    _worker_pool.ensure_started()
+    return _worker_pool
+
+def run_job(job, report_progress):
+    """Validierung eines Jobs im Hintergrund; Zwischenstände gehen per report_progress in die Queue."""
+    try:
+        report = run_validation(
+            job["file_path"], bool(job["is_pdf"]), job["mode"], bool(job["nonstandard"]),
+            progress=lambda stage, report: report_progress(stage, public_report(report)),
+        )
     finally:
+        try:
+            os.remove(job["file_path"])
+        except OSError:
+            pass
+    record_result(report, job["sha256"], "job")
+    return public_report(report, job["filename"])
+
+@bp.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    """
+    Asynchrone Variante von /api/validate: antwortet sofort mit 202 und einer Job-ID.
+    Gleiche Datei mit gleicher Stufe/Optionen liefert den vorhandenen Job (``deduplicated``).
+    """
+    uploaded = request.files.get("pdf_file")
+    if not uploaded or uploaded.filename == "":
+        return jsonify({"error": "Keine Datei ausgewählt oder hochgeladen."}), 400
+    mode = request.values.get("mode") or DEFAULT_VALIDATION_MODE
+    if mode not in VALIDATION_MODES:
+        return jsonify({"error": f"Unbekannte Validierungsstufe: {mode}", "modes": list(VALIDATION_MODES)}), 400
+    nonstandard = request.values.get("nonstandard") in ("1", "true", "on")
+
+    file_path, is_pdf, sha256 = save_upload(uploaded)
+    job_id, deduplicated = get_job_queue().submit(sha256, mode, nonstandard, uploaded.filename, file_path, is_pdf)
+    if deduplicated:
+        os.remove(file_path)
+    else:
+        get_worker_pool().notify()
+    status_url = url_for("validator.api_job_status", job_id=job_id)
+    return jsonify({
+        "job_id": job_id,
+        "deduplicated": deduplicated,
+        "status_url": status_url,
+        "events_url": url_for("validator.api_job_events", job_id=job_id),
+    }), 202, {"Location": status_url}
+
+@bp.route("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    """Status, aktuelle Stufe, Zwischenstand (``progress``) und – sobald fertig – der Report (``result``)."""
+    get_worker_pool()
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job unbekannt oder abgelaufen."}), 404
+    return jsonify(job_view(job))
+
+def job_view(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"] if job["status"] in (jobs.STATUS_QUEUED, jobs.STATUS_RUNNING) else None,
+        "result": job["result"],
+        "error": job["error"],
+        "filename": job["filename"],
+        "mode": job["mode"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+    }
+
+@bp.route("/api/jobs/<job_id>/events")
+def api_job_events(job_id):
+    """
+    Server-Sent Events: ``progress`` bei jeder neuen Stufe (mit Zwischenstand),
+    zum Schluss ``done`` bzw. ``failed`` mit dem vollständigen Job.
+    """
+    get_worker_pool()
+    job_queue = get_job_queue()
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Job unbekannt oder abgelaufen."}), 404
+    poll_interval = float(os.environ.get("SOVALIDATOR_SSE_POLL", "0.25"))
+    # Ein Stream belegt einen Thread; nach max_seconds schließen, EventSource verbindet sich neu
+    max_seconds = float(os.environ.get("SOVALIDATOR_SSE_MAX_SECONDS", "300"))
+
+    def events():
+        last_stage = None
+        last_sent = started = time.monotonic()
+        yield "retry: 1000\n\n"
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                yield "event: failed\ndata: {}\n\n"
+                return
+            if job["status"] in (jobs.STATUS_DONE, jobs.STATUS_FAILED):
+                yield f"event: {job['status']}\ndata: {json.dumps(job_view(job))}\n\n"
+                return
+            if job["stage"] != last_stage:
+                last_stage = job["stage"]
+                last_sent = time.monotonic()
+                yield f"event: progress\ndata: {json.dumps(job_view(job))}\n\n"
+            elif time.monotonic() - last_sent > 15:
+                # Kommentarzeile hält Proxy-Verbindungen offen
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            if time.monotonic() - started > max_seconds:
+                return
+            time.sleep(poll_interval)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def job_depth():
+    """Jobs je Status für /metrics (leer, wenn die Queue-Datenbank nicht erreichbar ist)."""
+    try:
+        depth = get_job_queue().depth()
+    except sqlite3.Error:
+        return {}
+    return {(status,): depth.get(status, 0)
+            for status in (jobs.STATUS_QUEUED, jobs.STATUS_RUNNING, jobs.STATUS_DONE, jobs.STATUS_FAILED)}
+
+metrics.register(metrics.CallbackMetric(
+    "sovalidator_jobs", "Asynchrone Jobs je Status (gemeinsame Queue aller Worker).", ("status",), job_depth,
+))
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Histogramme der Stufen-/Request-Dauer, Dokumentgrößen und Cache-Zugriffe (Prometheus-Textformat)."""
+    return Response(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+_result_store = None
+
+def get_result_store():
+    """Ergebnis-Datenbank (SOVALIDATOR_RESULTS_DB, Default .cache/results.sqlite3; leer = aus) oder None."""
+    global _result_store
+    db_path = os.environ.get("SOVALIDATOR_RESULTS_DB", os.path.join(CACHE_DIR, "results.sqlite3"))
+    if _result_store is None and db_path:
+        _result_store = result_store.ResultStore(db_path)
+    return _result_store
+
+def record_result(report, sha256, source):
+    """Report in der Ergebnis-Datenbank ablegen; Fehler dort dürfen die Validierung nicht scheitern lassen."""
+    try:
+        store = get_result_store()
+        if store is not None:
+            with metrics.span("result_store"):
+                store.record(report, sha256, CODELIST_VERSION, source)
+    except sqlite3.Error as e:
+        log.warning("Ergebnis nicht gespeichert", exc_info=e, extra={"sha256": sha256})
+
+def require_results_access():
+    """
+    Ergebnis-Abfragen (Lieferanten, Rechnungs-Hashes) nur mit Bearer-Token SOVALIDATOR_RESULTS_TOKEN.
+    Ohne konfiguriertes Token gibt es die Endpunkte nicht (404), auch nicht von localhost.
+    """
+    token = current_app.config["RESULTS_TOKEN"]
+    if not token:
+        abort(404)
+    if not bearer_token_ok(token):
+        abort(401)
+
+@bp.route("/api/results/top-errors")
+def api_top_errors():
+    """
+    Häufigste Fehler je Lieferant: ``days`` (90), ``seller``, ``kind`` (codelist/errorcode/schematron),
+    ``profile``, ``limit`` (20).
+    """
+    require_results_access()
+    store = get_result_store()
+    if store is None:
+        return jsonify({"error": "Ergebnis-Datenbank deaktiviert."}), 404
+    try:
+        days = int(request.args.get("days", 90))
+        limit = min(int(request.args.get("limit", 20)), 1000)
+    except ValueError:
+        return jsonify({"error": "days und limit müssen Zahlen sein."}), 400
+    if days < 1 or limit < 1:
+        return jsonify({"error": "days und limit müssen mindestens 1 sein."}), 400
+    t0 = time.perf_counter()
+    rows = store.top_errors(days, request.args.get("seller"), request.args.get("kind"),
+                            request.args.get("profile"), limit)
+    return jsonify({"days": days, "results": rows, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)})
+
+@bp.route("/api/results/invoice/<sha256>")
+def api_invoice_results(sha256):
+    """Gespeicherte Prüfungen einer Rechnung (SHA-256 der hochgeladenen Datei)."""
+    require_results_access()
+    store = get_result_store()
+    if store is None:
+        return jsonify({"error": "Ergebnis-Datenbank deaktiviert."}), 404
+    return jsonify({"invoice_sha256": sha256, "validations": store.invoice(sha256)})
+
+def bearer_token_ok(token):
+    """True, wenn `token` gesetzt ist und der Request ihn als ``Authorization: Bearer <token>`` mitschickt."""
+    if not token:
+        return False
+    sent = request.headers.get("Authorization", "").encode("utf-8", "replace")
+    return secrets.compare_digest(sent, f"Bearer {token}".encode("utf-8"))
+
+def require_debug_access():
+    """
+    Diagnose-Endpunkte: Bearer-Token SOVALIDATOR_DEBUG_TOKEN, sonst 404. Ein Aufruf von localhost
+    reicht nur, wenn der Betreiber das erlaubt (SOVALIDATOR_DEBUG_ALLOW_LOCAL) und die Proxy-Kette
+    angegeben hat (SOVALIDATOR_TRUSTED_PROXIES, 0 = kein Proxy) – hinter einem lokalen Reverse-Proxy
+    käme sonst jeder Request von 127.0.0.1.
+    """
+    config = current_app.config
+    if bearer_token_ok(config["DEBUG_TOKEN"]):
+        return
+    if (config["DEBUG_ALLOW_LOCAL"] and config["TRUSTED_PROXIES"] is not None
+            and request.remote_addr in ("127.0.0.1", "::1")):
+        return
+    abort(404)
+
+@bp.route("/debug/profiles")
+def list_profiles():
+    """Gespeicherte Profile (neueste zuerst) mit Rechnungs-Hash und Stufen-Dauern."""
+    require_debug_access()
+    return jsonify(profile_store().list())
+
+@bp.route("/debug/profiles/<capture_id>")
+def download_profile(capture_id):
+    """Profil herunterladen; `?format=pstats` liefert bei cProfile-Captures die Binärdatei für pstats/snakeviz."""
+    require_debug_access()
+    path = profile_store().file_path(capture_id, request.args.get("format", "profile"))
+    if not path or not os.path.exists(path):
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
+UNTRACED_ENDPOINTS = {"validator.metrics_endpoint", "validator.list_profiles", "validator.download_profile"}
+
+def profile_store():
+    config = current_app.config
+    return profiling.CaptureStore(config["PROFILE_DIR"], config["PROFILE_KEEP"])
+
+def requested_profiler():
+    """Profiler-Art für diesen Request: per Header/Parameter (falls erlaubt), sonst Stichproben bei gesetzter Schwelle."""
+    config = current_app.config
+    if config["PROFILE_ON_REQUEST"]:
+        kind = request.headers.get("X-SOValidator-Profile") or request.args.get("profile")
+        if kind in profiling.PROFILERS:
+            return kind, True
+    if config["PROFILE_THRESHOLD_MS"] > 0:
+        return "sample", False
+    return None, False
+
+@bp.before_app_request
+def start_request_trace():
+    if request.endpoint in UNTRACED_ENDPOINTS:
+        return
+    g.trace = metrics.start_trace(request.endpoint or "unknown")
+    kind, forced = requested_profiler()
+    if kind:
+        g.profiler = profiling.make_profiler(kind)
+        g.profiler_forced = forced
+        g.profiler.start()
+
+@bp.after_app_request
+def finish_request_trace(response):
+    trace = g.pop("trace", None)
+    if trace is not None:
+        finish_request_profile(trace, response.status_code)
+        if current_app.config.get("SERVER_TIMING"):
+            response.headers["Server-Timing"] = trace.server_timing()
+        metrics.finish_trace(trace, response.status_code)
+    return response
+
+@bp.after_app_request
+def compress_response(response):
+    level = current_app.config["COMPRESS_LEVEL"]
+    if level > 0:
+        compression.compress_response(response, request.headers.get("Accept-Encoding"), level,
+                                      current_app.config["COMPRESS_MIN_BYTES"])
+    return response
+
+@bp.teardown_app_request
+def discard_request_trace(exc):
+    # Bei unbehandelten Exceptions läuft after_request nicht; Trace trotzdem verwerfen
+    trace = g.pop("trace", None)
+    if trace is not None:
+        finish_request_profile(trace, 500)
+        metrics.finish_trace(trace, 500)
+
+def finish_request_profile(trace, status):
+    """Profiler stoppen und das Profil speichern, wenn er angefordert war oder die Schwelle überschritten ist."""
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+    profiler.stop()
+    elapsed_ms = trace.total() * 1000
+    if not (g.pop("profiler_forced", False) or elapsed_ms >= current_app.config["PROFILE_THRESHOLD_MS"]):
+        return
+    try:
+        profile_store().save(profiler, {
+            "endpoint": trace.endpoint,
+            "status": status,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "stages_ms": [[stage, round(seconds * 1000, 2)] for stage, seconds in trace.spans],
+            **trace.attrs,
+        })
+    except OSError:
+        pass  # Diagnose darf den Request nicht scheitern lassen
+
+def load_secret_key(cache_dir):
+    """SOVALIDATOR_SECRET_KEY oder ein einmal erzeugter, in `cache_dir` abgelegter Zufallsschlüssel."""
+    key = os.environ.get("SOVALIDATOR_SECRET_KEY")
+    if key:
+        return key
+    key_path = os.path.join(cache_dir, "secret_key")
+    try:
+        with open(key_path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    key = secrets.token_hex(32)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(key)
+    except FileExistsError:
+        # Anderer Worker war schneller
+        with open(key_path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
         pass
+    return key
 
-    # Fehlerausgabe ans Result anhängen
-    if error_reasons:
-        result += "<br><br><b>SON Fehlererkennung:</b><ul>"
-        for reason in error_reasons:
-            result += f"<li>{reason}</li>"
-        result += "</ul>"
-
-    return render_template("index.html",
-                           result=result,
-                           filename=filename,
-                           excerpt=excerpt,
-                           highlight_line=highlight_line,
-                           suggestion="<br>".join(suggestions),
-                           syntax_table=syntax_table,
-                           codelist_table=codelist_table,
-                           codelisten_hinweis="ℹ️ Hinweis: Codelistenprüfung basiert auf EN16931 v14 (gültig ab 2024-11-15).",
-                           original_xml=xml,
-                           xml_standard=xml_standard
-    )
+def create_app(config=None):
+    """
+    App-Factory. Lädt nichts Schweres; Schemas, XSLT und Codelisten kommen beim ersten Bedarf
+    oder vorab über warm_up().
+    """
+    app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
+    app.secret_key = load_secret_key(CACHE_DIR)
+    app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
+    jsonlog.configure_logging()
+    # Server-Timing-Header mit den Stufen-Dauern (nur für Diagnose, verrät Interna)
+    app.config['SERVER_TIMING'] = os.environ.get("SOVALIDATOR_SERVER_TIMING", "") in ("1", "true", "on")
+    # Profiling: Stichproben-Profil für Requests über der Schwelle (0 = aus); per Header/Parameter nur wenn erlaubt
+    app.config['PROFILE_THRESHOLD_MS'] = float(os.environ.get("SOVALIDATOR_PROFILE_THRESHOLD_MS", "0"))
+    app.config['PROFILE_ON_REQUEST'] = os.environ.get("SOVALIDATOR_PROFILE_ON_REQUEST", "") in ("1", "true", "on")
+    app.config['PROFILE_DIR'] = os.environ.get("SOVALIDATOR_PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+    app.config['PROFILE_KEEP'] = int(os.environ.get("SOVALIDATOR_PROFILE_KEEP", "50"))
+    # gzip/deflate für HTML/JSON/Text ab COMPRESS_MIN_BYTES (Level 0 = aus, z.B. wenn der Proxy komprimiert)
+    app.config['COMPRESS_LEVEL'] = int(os.environ.get("SOVALIDATOR_COMPRESS_LEVEL", "6"))
+    app.config['COMPRESS_MIN_BYTES'] = int(os.environ.get("SOVALIDATOR_COMPRESS_MIN_BYTES", "500"))
+    # Serverseitig abgelegte Uploads für /download_corrected (Handle statt XML im Formular)
+    app.config['DOCUMENT_DIR'] = os.environ.get("SOVALIDATOR_DOCUMENT_DIR", os.path.join(CACHE_DIR, "documents"))
+    app.config['DOCUMENT_TTL'] = int(os.environ.get("SOVALIDATOR_DOCUMENT_TTL", "3600"))
+    # Zugriff auf /debug/*: Token; localhost nur mit ausdrücklicher Freigabe und bekannter Proxy-Kette
+    app.config['DEBUG_TOKEN'] = os.environ.get("SOVALIDATOR_DEBUG_TOKEN") or None
+    app.config['DEBUG_ALLOW_LOCAL'] = os.environ.get("SOVALIDATOR_DEBUG_ALLOW_LOCAL", "") in ("1", "true", "on")
+    # /api/results/*: nur mit Token, ohne Token abgeschaltet
+    app.config['RESULTS_TOKEN'] = os.environ.get("SOVALIDATOR_RESULTS_TOKEN") or None
+    proxies = os.environ.get("SOVALIDATOR_TRUSTED_PROXIES", "")
+    app.config['TRUSTED_PROXIES'] = int(proxies) if proxies else None
+    if config:
+        app.config.update(config)
+    if app.config['TRUSTED_PROXIES']:
+        # Client-Adresse aus X-Forwarded-For der angegebenen Anzahl vertrauenswürdiger Proxies
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        n = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=n, x_proto=n, x_host=n)
+    app.register_blueprint(bp)
+    return app
+
+def memory_usage():
+    """RSS und davon mit anderen Prozessen geteilte Seiten (kB) aus /proc; leer auf Nicht-Linux."""
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+def warm_up(freeze=True):
+    """
+    Alles Teure vorab laden: Codelisten, Profil-XSDs (inkl. UBL), Element-Whitelists,
+    Schematron-XSLT und PyMuPDF. Für gunicorn --preload im Master vor dem Fork aufrufen;
+    danach verschiebt gc.freeze() die Objekte in die permanente Generation, damit der
+    Garbage Collector der Worker die geteilten Seiten nicht anfasst (Copy-on-Write bleibt erhalten).
+
+    :return: Dict Schritt → Dauer in ms
+    """
+    timings = {}
+
+    def step(name, func):
+        t0 = time.perf_counter()
+        func()
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def compile_schemas():
+        for _, profile in PROFILE_MARKERS:
+            get_profile_schema(DEFAULT_XSD_ROOT, profile)
+        get_ubl_schema()
+
+    step("code_sets", get_code_sets)
+    step("xsd", compile_schemas)
+    step("element_whitelists", get_element_whitelists)
+    step("schematron", lambda: get_schematron_transform(DEFAULT_XSLT_PATH))
+    step("pymupdf", lambda: __import__("fitz"))
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return timings
+
+app = create_app()
 
 if __name__ == "__main__":
+    if "--warmup-report" in sys.argv:
+        t0 = time.perf_counter()
+        timings = warm_up()
+        timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
+        print(json.dumps({"warm_up_ms": timings, "memory_kb": memory_usage()}, indent=2))
+        sys.exit(0)
     if hasattr(sys, '_MEIPASS'):
         app.run(debug=True, host="127.0.0.1", port=5000)
     else:
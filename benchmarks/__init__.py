@@ -0,0 +1 @@
+"""Benchmarks und synthetischer Rechnungskorpus für SOValidator (Aufruf: python -m benchmarks)."""
@@ -0,0 +1,94 @@
+"""
+python -m benchmarks generate OUT_DIR [--profiles ...] [--lines 10,1000] [--invalid-rate 0.05] [--pdf]
+python -m benchmarks run [--corpus DIR | Generator-Optionen] [--stages ...] [--repeat 5] [--out bench.json]
+python -m benchmarks golden CORPUS_DIR [--golden DIR] [--budgets budgets.json] [--update] [--out result.json]
+
+Aus dem Repository-Wurzelverzeichnis aufrufen (app.py nutzt relative Pfade).
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.corpus import PROFILES, write_corpus
+from benchmarks.golden import format_result, load_budgets, run_golden
+from benchmarks.stages import STAGES, run_benchmarks
+
+
+def _csv(value):
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _add_corpus_args(parser):
+    parser.add_argument("--profiles", type=_csv, default=PROFILES, help="Kommagetrennt, Default: alle")
+    parser.add_argument("--lines", type=lambda v: [int(n) for n in _csv(v)], default=[10, 1000],
+                        help="Positionsanzahlen, kommagetrennt (10 – 50000)")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Anteil ungültiger Codewerte (0.0 – 1.0)")
+    parser.add_argument("--pdf", action="store_true", help="Als factur-x.xml in PDF/A-3 einbetten")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Synthetischen Korpus schreiben")
+    gen.add_argument("out_dir")
+    _add_corpus_args(gen)
+
+    run = sub.add_parser("run", help="Stufen-Benchmarks ausführen")
+    run.add_argument("--corpus", help="Vorhandener Korpus (sonst wird ein temporärer erzeugt)")
+    _add_corpus_args(run)
+    run.add_argument("--stages", type=_csv, default=STAGES)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--out", default="-", help="JSON-Datei oder - für stdout")
+
+    golden = sub.add_parser("golden", help="Reports gegen Golden-Dateien und Budgets prüfen (Exit 1 bei Abweichung)")
+    golden.add_argument("corpus")
+    golden.add_argument("--golden", help="Verzeichnis der Golden-Dateien (Default CORPUS/golden)")
+    golden.add_argument("--budgets", help="Budget-Datei (Default benchmarks/budgets.json)")
+    golden.add_argument("--update", action="store_true", help="Fehlende/abweichende Golden-Dateien neu schreiben")
+    golden.add_argument("--out", help="Ergebnis zusätzlich als JSON schreiben")
+
+    args = parser.parse_args(argv)
+    if args.command == "golden":
+        result = run_golden(args.corpus, args.golden, load_budgets(args.budgets), args.update)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+        print(format_result(result))
+        return 1 if result["failures"] else 0
+    if args.command == "generate":
+        manifest = write_corpus(args.out_dir, args.profiles, args.lines, args.invalid_rate, args.pdf, args.seed)
+        print(f"{len(manifest)} Dateien nach {args.out_dir} geschrieben.")
+        return 0
+
+    corpus = args.corpus
+    if not corpus:
+        corpus = tempfile.mkdtemp(prefix="sovalidator-corpus-")
+        write_corpus(corpus, args.profiles, args.lines, args.invalid_rate, args.pdf, args.seed)
+    manifest = {}
+    manifest_path = os.path.join(corpus, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = {entry["file"]: entry for entry in json.load(f)}
+    files = sorted(glob.glob(os.path.join(corpus, "*.xml")) + glob.glob(os.path.join(corpus, "*.pdf")))
+    result = run_benchmarks(files, manifest, args.stages, args.repeat)
+    result["meta"]["corpus"] = corpus
+
+    output = json.dumps(result, indent=2)
+    if args.out == "-":
+        print(output)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+        for row in result["results"]:
+            print(f"{row['file']:<22} {row['stage']:<11} {row['median_ms']:>10.2f} ms  "
+                  f"{row['mb_per_s'] or 0:>8.2f} MB/s  {row['peak_py_kb']:>10.1f} kB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
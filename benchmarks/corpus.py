@@ -0,0 +1,202 @@
+"""
+Generator für synthetische ZUGFeRD/Factur-X-Rechnungen (CII) je Profil aus ZF232_DE/Schema.
+
+Deterministisch über `seed`. MINIMUM und BASIC WL kennen keine Positionen; dort wird
+`line_items` ignoriert.
+"""
+import json
+import os
+import random
+from xml.sax.saxutils import escape
+
+PROFILES = ["MINIMUM", "BASICWL", "BASIC", "EN16931", "EXTENDED"]
+PROFILES_WITH_LINES = {"BASIC", "EN16931", "EXTENDED"}
+
+GUIDELINE_IDS = {
+    "MINIMUM": "urn:factur-x.eu:1p0:minimum",
+    "BASICWL": "urn:factur-x.eu:1p0:basicwl",
+    "BASIC": "urn:cen.eu:en16931:2017#compliant#urn:factur-x.eu:1p0:basic",
+    "EN16931": "urn:cen.eu:en16931:2017",
+    "EXTENDED": "urn:cen.eu:en16931:2017#conformant#urn:factur-x.eu:1p0:extended",
+}
+
+# Gültiger Wert → typische Fehleingaben (Tippfehler, Kleinschreibung, Leerwert)
+VALID_CODES = {
+    "currency": ("EUR", ["EUX", "eur", "€"]),
+    "country": ("DE", ["XX", "de", "GER"]),
+    "unit": ("C62", ["PCS", "Stk", "c62"]),
+    "category": ("S", ["s", "X", ""]),
+    "payment": ("58", ["58x", "99x", "SEPA"]),
+}
+
+XMP_PDFA3 = """<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about="" xmlns:pdfaid="http://www.aiim.org/pdfa/ns/id/">
+   <pdfaid:part>3</pdfaid:part>
+   <pdfaid:conformance>B</pdfaid:conformance>
+  </rdf:Description>
+  <rdf:Description rdf:about="" xmlns:fx="urn:factur-x:pdfa:CrossIndustryDocument:invoice:1p0#">
+   <fx:DocumentType>INVOICE</fx:DocumentType>
+   <fx:DocumentFileName>factur-x.xml</fx:DocumentFileName>
+   <fx:Version>1.0</fx:Version>
+   <fx:ConformanceLevel>{level}</fx:ConformanceLevel>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>
+<?xpacket end="w"?>"""
+
+
+class _Codes:
+    """Liefert Codewerte; mit Wahrscheinlichkeit `invalid_rate` einen ungültigen."""
+
+    def __init__(self, rng, invalid_rate):
+        self.rng = rng
+        self.invalid_rate = invalid_rate
+        self.invalid = 0
+
+    def __call__(self, kind):
+        valid, invalid = VALID_CODES[kind]
+        if self.invalid_rate and self.rng.random() < self.invalid_rate:
+            self.invalid += 1
+            return escape(self.rng.choice(invalid))
+        return valid
+
+
+def generate_invoice(profile="EN16931", line_items=10, invalid_rate=0.0, seed=0):
+    """
+    Eine CII-Rechnung als String erzeugen.
+
+    :param invalid_rate: Anteil der Codewerte (Währung, Land, Einheit, Steuerkategorie,
+        Zahlungsart), die durch ungültige Werte ersetzt werden (0.0 – 1.0)
+    :return: (xml, Anzahl ungültiger Codewerte)
+    """
+    rng = random.Random(f"{profile}-{line_items}-{invalid_rate}-{seed}")
+    code = _Codes(rng, invalid_rate)
+    with_lines = profile in PROFILES_WITH_LINES
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rsm:CrossIndustryInvoice'
+        ' xmlns:rsm="urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100"'
+        ' xmlns:qdt="urn:un:unece:uncefact:data:standard:QualifiedDataType:100"'
+        ' xmlns:ram="urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100"'
+        ' xmlns:udt="urn:un:unece:uncefact:data:standard:UnqualifiedDataType:100">\n'
+        '  <rsm:ExchangedDocumentContext>\n'
+        '    <ram:GuidelineSpecifiedDocumentContextParameter>\n'
+        f'      <ram:ID>{GUIDELINE_IDS[profile]}</ram:ID>\n'
+        '    </ram:GuidelineSpecifiedDocumentContextParameter>\n'
+        '  </rsm:ExchangedDocumentContext>\n'
+        '  <rsm:ExchangedDocument>\n'
+        f'    <ram:ID>RE-{seed:06d}</ram:ID>\n'
+        '    <ram:TypeCode>380</ram:TypeCode>\n'
+        '    <ram:IssueDateTime><udt:DateTimeString format="102">20240115</udt:DateTimeString></ram:IssueDateTime>\n'
+        '  </rsm:ExchangedDocument>\n'
+        '  <rsm:SupplyChainTradeTransaction>\n'
+    ]
+
+    line_total = 0
+    if with_lines:
+        for n in range(1, line_items + 1):
+            quantity = rng.randint(1, 20)
+            price_cents = rng.randint(100, 100000)
+            amount_cents = quantity * price_cents
+            line_total += amount_cents
+            parts.append(
+                '    <ram:IncludedSupplyChainTradeLineItem>\n'
+                f'      <ram:AssociatedDocumentLineDocument><ram:LineID>{n}</ram:LineID></ram:AssociatedDocumentLineDocument>\n'
+                f'      <ram:SpecifiedTradeProduct><ram:Name>Artikel {n}</ram:Name></ram:SpecifiedTradeProduct>\n'
+                '      <ram:SpecifiedLineTradeAgreement>\n'
+                f'        <ram:NetPriceProductTradePrice><ram:ChargeAmount>{price_cents / 100:.2f}</ram:ChargeAmount></ram:NetPriceProductTradePrice>\n'
+                '      </ram:SpecifiedLineTradeAgreement>\n'
+                f'      <ram:SpecifiedLineTradeDelivery><ram:BilledQuantity unitCode="{code("unit")}">{quantity}</ram:BilledQuantity></ram:SpecifiedLineTradeDelivery>\n'
+                '      <ram:SpecifiedLineTradeSettlement>\n'
+                f'        <ram:ApplicableTradeTax><ram:TypeCode>VAT</ram:TypeCode><ram:CategoryCode>{code("category")}</ram:CategoryCode><ram:RateApplicablePercent>19</ram:RateApplicablePercent></ram:ApplicableTradeTax>\n'
+                f'        <ram:SpecifiedTradeSettlementLineMonetarySummation><ram:LineTotalAmount>{amount_cents / 100:.2f}</ram:LineTotalAmount></ram:SpecifiedTradeSettlementLineMonetarySummation>\n'
+                '      </ram:SpecifiedLineTradeSettlement>\n'
+                '    </ram:IncludedSupplyChainTradeLineItem>\n'
+            )
+    else:
+        line_total = rng.randint(1000, 1000000)
+
+    tax = round(line_total * 0.19)
+    party_id = "" if profile == "MINIMUM" else f"<ram:ID>SUP-{seed % 97:03d}</ram:ID>"
+    parts.append(
+        '    <ram:ApplicableHeaderTradeAgreement>\n'
+        f'      <ram:SellerTradeParty>{party_id}<ram:Name>Lieferant {seed % 97}</ram:Name>'
+        f'<ram:PostalTradeAddress><ram:CountryID>{code("country")}</ram:CountryID></ram:PostalTradeAddress>'
+        '<ram:SpecifiedTaxRegistration><ram:ID schemeID="VA">DE123456789</ram:ID></ram:SpecifiedTaxRegistration></ram:SellerTradeParty>\n'
+        '      <ram:BuyerTradeParty><ram:Name>Kunde GmbH</ram:Name>'
+        f'<ram:PostalTradeAddress><ram:CountryID>{code("country")}</ram:CountryID></ram:PostalTradeAddress></ram:BuyerTradeParty>\n'
+        '    </ram:ApplicableHeaderTradeAgreement>\n'
+        '    <ram:ApplicableHeaderTradeDelivery/>\n'
+        '    <ram:ApplicableHeaderTradeSettlement>\n'
+        f'      <ram:InvoiceCurrencyCode>{code("currency")}</ram:InvoiceCurrencyCode>\n'
+    )
+    if profile != "MINIMUM":
+        parts.append(
+            f'      <ram:SpecifiedTradeSettlementPaymentMeans><ram:TypeCode>{code("payment")}</ram:TypeCode></ram:SpecifiedTradeSettlementPaymentMeans>\n'
+            f'      <ram:ApplicableTradeTax><ram:CalculatedAmount>{tax / 100:.2f}</ram:CalculatedAmount><ram:TypeCode>VAT</ram:TypeCode>'
+            f'<ram:BasisAmount>{line_total / 100:.2f}</ram:BasisAmount><ram:CategoryCode>{code("category")}</ram:CategoryCode>'
+            '<ram:RateApplicablePercent>19</ram:RateApplicablePercent></ram:ApplicableTradeTax>\n'
+        )
+    parts.append('      <ram:SpecifiedTradeSettlementHeaderMonetarySummation>\n')
+    if profile != "MINIMUM":
+        parts.append(f'        <ram:LineTotalAmount>{line_total / 100:.2f}</ram:LineTotalAmount>\n')
+    parts.append(
+        f'        <ram:TaxBasisTotalAmount>{line_total / 100:.2f}</ram:TaxBasisTotalAmount>\n'
+        f'        <ram:TaxTotalAmount currencyID="EUR">{tax / 100:.2f}</ram:TaxTotalAmount>\n'
+        f'        <ram:GrandTotalAmount>{(line_total + tax) / 100:.2f}</ram:GrandTotalAmount>\n'
+        f'        <ram:DuePayableAmount>{(line_total + tax) / 100:.2f}</ram:DuePayableAmount>\n'
+        '      </ram:SpecifiedTradeSettlementHeaderMonetarySummation>\n'
+        '    </ram:ApplicableHeaderTradeSettlement>\n'
+        '  </rsm:SupplyChainTradeTransaction>\n'
+        '</rsm:CrossIndustryInvoice>\n'
+    )
+    return "".join(parts), code.invalid
+
+
+def embed_in_pdf(xml, pdf_path, profile="EN16931"):
+    """
+    XML als factur-x.xml in eine einseitige PDF einbetten (PyMuPDF) und PDF/A-3-XMP setzen.
+
+    Das Ergebnis trägt die PDF/A-3- und Factur-X-Kennungen, ist aber kein geprüftes PDF/A-3.
+    """
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Synthetische Rechnung (Benchmark)")
+    doc.embfile_add("factur-x.xml", xml.encode("utf-8"), filename="factur-x.xml", desc="Factur-X Invoice")
+    doc.set_xml_metadata(XMP_PDFA3.format(level=profile.replace("BASICWL", "BASIC WL")))
+    doc.save(pdf_path)
+    doc.close()
+
+
+def write_corpus(out_dir, profiles=PROFILES, line_counts=(10,), invalid_rate=0.0, pdf=False, seed=0):
+    """
+    Korpus nach `out_dir` schreiben: eine Datei je Profil × Positionsanzahl plus manifest.json.
+
+    :return: Liste der Manifest-Einträge (file, profile, line_items, invalid_codes, bytes)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for profile in profiles:
+        for lines in line_counts:
+            xml, invalid = generate_invoice(profile, lines, invalid_rate, seed)
+            name = f"{profile}_{lines}"
+            if pdf:
+                path = os.path.join(out_dir, f"{name}.pdf")
+                embed_in_pdf(xml, path, profile)
+            else:
+                path = os.path.join(out_dir, f"{name}.xml")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(xml)
+            manifest.append({
+                "file": os.path.basename(path),
+                "profile": profile,
+                "line_items": lines if profile in PROFILES_WITH_LINES else 0,
+                "invalid_codes": invalid,
+                "bytes": len(xml.encode("utf-8")),
+            })
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,203 @@
+"""
+Golden-Report-Regression: jede Rechnung eines Korpus durch die ganze Pipeline (run_validation:
+Extraktion, Wohlgeformtheit, XSD, Schematron, Codelisten, E00xx-Regeln) schicken, den Report
+mit der gespeicherten Golden-Datei vergleichen und Laufzeit/Speicher gegen Budgets prüfen.
+
+Golden-Dateien liegen als <relativer Pfad>.json unter GOLDEN_DIR (Default KORPUS/golden).
+Budgets kommen aus einer JSON-Datei (Default benchmarks/budgets.json):
+
+    {
+      "mode": "full", "repeat": 3,
+      "document": {"max_ms": 2000, "max_peak_py_kb": 262144},
+      "files": {"EN16931_50000.xml": {"max_ms": 30000}},
+      "aggregate": {"max_total_ms": 120000, "max_p95_ms": 5000, "max_rss_kb": 2097152}
+    }
+
+`document` gilt für jede Datei, `files` überschreibt einzelne Werte je relativem Pfad
+(fnmatch-Muster erlaubt). Zeit ist der Median aus `repeat` Läufen, Speicher die Python-Heap-Spitze
+(tracemalloc) eines zusätzlichen Laufs; `max_rss_kb` prüft den Prozess-Höchststand am Ende.
+Alles läuft lokal, ohne Netzwerkzugriff.
+"""
+import difflib
+import fnmatch
+import json
+import os
+import resource
+import statistics
+
+from benchmarks.stages import measure
+
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budgets.json")
+EXTENSIONS = (".pdf", ".xml")
+# Nicht Teil des Urteils: Laufzeit und Konfiguration ändern sich, ohne dass sich das Ergebnis ändert
+VOLATILE_KEYS = ("xml", "raw_xml", "elapsed_ms", "budget_ms")
+
+
+def load_budgets(path=None):
+    with open(path or DEFAULT_BUDGETS, encoding="utf-8") as f:
+        budgets = json.load(f)
+    budgets.setdefault("mode", "full")
+    budgets.setdefault("repeat", 3)
+    budgets.setdefault("document", {})
+    budgets.setdefault("files", {})
+    budgets.setdefault("aggregate", {})
+    return budgets
+
+
+def document_budget(budgets, rel_path):
+    """Budget einer Datei: `document`, überschrieben von passenden Einträgen unter `files`."""
+    budget = dict(budgets["document"])
+    for pattern, override in budgets["files"].items():
+        if fnmatch.fnmatch(rel_path, pattern):
+            budget.update(override)
+    return budget
+
+
+def corpus_files(corpus, golden_dir):
+    """Relative Pfade aller PDF/XML-Dateien unter `corpus` (rekursiv, ohne das Golden-Verzeichnis)."""
+    golden_dir = os.path.abspath(golden_dir)
+    files = []
+    for root, dirs, names in os.walk(corpus):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".")
+                         and os.path.abspath(os.path.join(root, d)) != golden_dir)
+        for name in sorted(names):
+            if name.lower().endswith(EXTENSIONS):
+                files.append(os.path.relpath(os.path.join(root, name), corpus))
+    return files
+
+
+def verdict(report):
+    """Vergleichbarer Teil des Reports (ohne XML-Texte und Zeiten)."""
+    return {key: value for key, value in report.items() if key not in VOLATILE_KEYS}
+
+
+def _golden_path(golden_dir, rel_path):
+    return os.path.join(golden_dir, rel_path + ".json")
+
+
+def _dump(data):
+    return json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+def diff_text(expected, actual, rel_path):
+    """Unified Diff zweier Reports (JSON, sortierte Schlüssel)."""
+    return "".join(difflib.unified_diff(
+        _dump(expected).splitlines(keepends=True), _dump(actual).splitlines(keepends=True),
+        fromfile=f"golden/{rel_path}", tofile=f"aktuell/{rel_path}",
+    ))
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_golden(corpus, golden_dir=None, budgets=None, update=False):
+    """
+    Korpus prüfen. Mit `update` werden fehlende oder abweichende Golden-Dateien neu geschrieben
+    statt als Fehler gemeldet; Budgets werden trotzdem geprüft.
+
+    :return: Ergebnis-Dict mit documents, aggregate und failures (leer = bestanden)
+    """
+    import app
+
+    golden_dir = golden_dir or os.path.join(corpus, "golden")
+    budgets = budgets or load_budgets()
+    mode = budgets["mode"]
+    app.warm_up(freeze=False)
+    failures = []
+    documents = []
+
+    files = corpus_files(corpus, golden_dir)
+    for rel_path in files:
+        path = os.path.join(corpus, rel_path)
+        is_pdf = rel_path.lower().endswith(".pdf")
+        sha256 = app.file_sha256(path)
+        actual = verdict(app.run_validation(path, is_pdf, mode))
+        times, peak = measure(lambda: app.run_validation(path, is_pdf, mode), budgets["repeat"])
+        median_ms = statistics.median(times)
+        entry = {"file": rel_path, "median_ms": round(median_ms, 2),
+                 "peak_py_kb": round(peak / 1024, 1), "accepted": actual.get("accepted")}
+        documents.append(entry)
+
+        golden_path = _golden_path(golden_dir, rel_path)
+        try:
+            with open(golden_path, encoding="utf-8") as f:
+                golden = json.load(f)
+        except FileNotFoundError:
+            golden = None
+        if golden is None:
+            problem = ("missing_golden", f"Keine Golden-Datei {golden_path} (mit --update anlegen)")
+        elif golden.get("sha256") != sha256:
+            problem = ("corpus_changed", "Korpusdatei geändert (SHA-256), Golden mit --update neu schreiben")
+        elif golden.get("mode") != mode:
+            problem = ("mode_mismatch", f"Golden mit Stufe {golden.get('mode')} erzeugt, Budgets verlangen {mode}")
+        elif golden["report"] != actual:
+            problem = ("verdict_changed", "Report weicht vom Golden ab")
+        else:
+            problem = None
+        if problem and update:
+            os.makedirs(os.path.dirname(golden_path), exist_ok=True)
+            with open(golden_path, "w", encoding="utf-8") as f:
+                f.write(_dump({"file": rel_path, "sha256": sha256, "mode": mode, "report": actual}) + "\n")
+            entry["golden"] = "written"
+        elif problem:
+            failure = {"file": rel_path, "kind": problem[0], "message": problem[1]}
+            if problem[0] == "verdict_changed":
+                failure["diff"] = diff_text(golden["report"], actual, rel_path)
+            failures.append(failure)
+
+        budget = document_budget(budgets, rel_path)
+        if "max_ms" in budget and median_ms > budget["max_ms"]:
+            failures.append({"file": rel_path, "kind": "latency_budget",
+                             "message": f"Median {median_ms:.1f} ms > Budget {budget['max_ms']} ms"})
+        if "max_peak_py_kb" in budget and peak / 1024 > budget["max_peak_py_kb"]:
+            failures.append({"file": rel_path, "kind": "memory_budget",
+                             "message": f"Heap-Spitze {peak / 1024:.0f} kB > Budget {budget['max_peak_py_kb']} kB"})
+
+    if os.path.isdir(golden_dir):
+        known = {_golden_path(golden_dir, rel_path) for rel_path in files}
+        for root, _, names in os.walk(golden_dir):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                if name.endswith(".json") and path not in known:
+                    failures.append({"file": os.path.relpath(path, golden_dir), "kind": "orphan_golden",
+                                     "message": "Golden-Datei ohne Korpusdatei"})
+
+    medians = [entry["median_ms"] for entry in documents]
+    aggregate = {
+        "documents": len(documents),
+        "total_ms": round(sum(medians), 1),
+        "p95_ms": round(_percentile(medians, 0.95), 1),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    limits = budgets["aggregate"]
+    for key, limit_key, unit in (("total_ms", "max_total_ms", "ms"), ("p95_ms", "max_p95_ms", "ms"),
+                                 ("max_rss_kb", "max_rss_kb", "kB")):
+        if limit_key in limits and aggregate[key] > limits[limit_key]:
+            failures.append({"file": None, "kind": "aggregate_budget",
+                             "message": f"{key} {aggregate[key]} {unit} > Budget {limits[limit_key]} {unit}"})
+    return {"mode": mode, "golden_dir": golden_dir, "documents": documents,
+            "aggregate": aggregate, "failures": failures}
+
+
+def format_result(result):
+    """Lesbare Zusammenfassung: eine Zeile je Datei, danach alle Abweichungen mit Diff."""
+    lines = []
+    for entry in result["documents"]:
+        flag = " (golden geschrieben)" if entry.get("golden") else ""
+        lines.append(f"{entry['file']:<40} {entry['median_ms']:>10.1f} ms {entry['peak_py_kb']:>10.1f} kB{flag}")
+    agg = result["aggregate"]
+    lines.append(f"{agg['documents']} Dokumente, Summe {agg['total_ms']} ms, p95 {agg['p95_ms']} ms, "
+                 f"RSS max {agg['max_rss_kb']} kB (Stufe {result['mode']})")
+    if not result["failures"]:
+        lines.append("OK: alle Reports wie Golden, alle Budgets eingehalten.")
+        return "\n".join(lines)
+    lines.append(f"FEHLER: {len(result['failures'])} Abweichung(en)")
+    for failure in result["failures"]:
+        lines.append(f"- [{failure['kind']}] {failure['file'] or 'Korpus'}: {failure['message']}")
+        if failure.get("diff"):
+            lines.extend("    " + line for line in failure["diff"].splitlines())
+    return "\n".join(lines)
@@ -0,0 +1,133 @@
+"""
+Benchmarks der einzelnen Pipeline-Stufen aus app.py und der gesamten Pipeline.
+
+Jede Stufe läuft `repeat`-mal (Zeiten) und einmal zusätzlich unter tracemalloc (Python-Heap-Spitze).
+Speicher von libxml2/MuPDF sieht tracemalloc nicht; dafür steht `max_rss_kb` (Prozess-Höchststand) im Ergebnis.
+"""
+import os
+import platform
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+STAGES = [
+    "extraction", "parse", "xsd", "schematron", "codelists", "errorcodes",
+    "correction", "reembed", "end_to_end",
+]
+
+
+def _prepare(app, path, meta):
+    """Eingaben aller Stufen einmal vorab berechnen, damit jede Stufe isoliert gemessen wird."""
+    from lxml import etree
+    is_pdf = path.lower().endswith(".pdf")
+    if is_pdf:
+        xml = app.extract_xml_from_pdf(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            xml = f.read()
+    doc = etree.fromstring(xml.encode("utf-8"))
+    profile = app.detect_profile(doc)
+    findings = app.check_codelists(xml)
+    # Positionskorrekturen wie Web-UI und Hot-Folder (Label|start|ende|Vorschlag)
+    corrections = [f"{f['label']}|{f['start']}|{f['end']}|{f['suggestion']}" for f in findings if f["suggestion"]]
+    corrected = app.apply_corrections(xml, corrections)
+    if corrections and corrected == xml:
+        raise RuntimeError(f"{path}: {len(corrections)} Korrekturen ohne Wirkung, correction/reembed würden nichts messen")
+    return {"path": path, "is_pdf": is_pdf, "xml": xml, "doc": doc, "profile": profile,
+            "corrections": corrections, "corrected": corrected}
+
+
+def _stage_callables(app, ctx, out_pdf):
+    from lxml import etree
+    stages = {
+        "parse": lambda: etree.fromstring(ctx["xml"].encode("utf-8")),
+        "xsd": lambda: app.validate_against_profile_xsd(ctx["doc"], ctx["xml"], app.DEFAULT_XSD_ROOT, ctx["profile"]),
+        "schematron": lambda: app.validate_with_schematron(ctx["xml"], app.DEFAULT_XSLT_PATH),
+        "codelists": lambda: app.check_codelists(ctx["xml"]),
+        "errorcodes": lambda: app.find_errorcodes(
+            ctx["xml"], ctx["path"] if ctx["is_pdf"] else None, "full", ctx["doc"]),
+        "correction": lambda: app.apply_corrections(ctx["xml"], ctx["corrections"]),
+    }
+
+    def end_to_end():
+        report = app.run_validation(ctx["path"], ctx["is_pdf"], "full")
+        if ctx["is_pdf"]:
+            corrected = app.apply_corrections(report["xml"], ctx["corrections"])
+            app.embed_xml_in_pdf(ctx["path"], app.xml_escape_values(corrected), out_pdf)
+
+    if ctx["is_pdf"]:
+        stages["extraction"] = lambda: app.extract_xml_from_pdf(ctx["path"])
+        stages["reembed"] = lambda: app.embed_xml_in_pdf(ctx["path"], ctx["corrected"], out_pdf)
+    stages["end_to_end"] = end_to_end
+    return stages
+
+
+def measure(func, repeat):
+    """`func` `repeat`-mal timen, danach einmal unter tracemalloc. Rückgabe: (Zeiten in ms, Heap-Spitze in Bytes)."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmarks(files, manifest=None, stages=STAGES, repeat=5):
+    """
+    Alle Stufen für alle Dateien messen.
+
+    :param files: Pfade zu XML- oder PDF-Rechnungen
+    :param manifest: optional Dict Dateiname → Manifest-Eintrag (Profil, Positionen, ...)
+    :return: Ergebnis-Dict (meta, results) für JSON
+    """
+    import lxml.etree
+    import app
+
+    app.warm_up(freeze=False)
+    manifest = manifest or {}
+    results = []
+    out_pdf = os.path.join(tempfile.mkdtemp(prefix="sovalidator-bench-"), "out.pdf")
+    for path in files:
+        meta = manifest.get(os.path.basename(path), {})
+        ctx = _prepare(app, path, meta)
+        size = len(ctx["xml"].encode("utf-8"))
+        callables = _stage_callables(app, ctx, out_pdf)
+        for stage in stages:
+            if stage not in callables:
+                continue
+            times, peak = measure(callables[stage], repeat)
+            median = statistics.median(times)
+            results.append({
+                "file": os.path.basename(path),
+                "profile": ctx["profile"],
+                "line_items": meta.get("line_items"),
+                "invalid_codes": meta.get("invalid_codes"),
+                "xml_bytes": size,
+                "stage": stage,
+                "runs": repeat,
+                "median_ms": round(median, 3),
+                "min_ms": round(min(times), 3),
+                "max_ms": round(max(times), 3),
+                "docs_per_s": round(1000 / median, 2) if median else None,
+                "mb_per_s": round(size / 1e6 / (median / 1000), 2) if median else None,
+                "peak_py_kb": round(peak / 1024, 1),
+                "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            })
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "lxml": ".".join(map(str, lxml.etree.LXML_VERSION)),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
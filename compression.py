@@ -0,0 +1,71 @@
+import zlib
+
+COMPRESSIBLE_TYPES = ("text/html", "text/plain", "application/json", "application/xml", "text/xml")
+# zlib: 16 + MAX_WBITS → gzip-Container, MAX_WBITS → zlib-Container (HTTP "deflate")
+WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def choose_encoding(accept_encoding):
+    """gzip oder deflate, je nach Accept-Encoding (q=0 schließt aus); sonst None."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in ("gzip", "deflate"):
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress_chunks(chunks, encoding, level=6, flush_bytes=16384):
+    """
+    Gestreamten Body komprimieren. Nach jeweils `flush_bytes` Eingabe wird mit Z_SYNC_FLUSH
+    ausgegeben, damit der Browser die ersten Teile des Reports früh anzeigen kann, ohne dass
+    jeder kleine Template-Schnipsel einen eigenen Block erzeugt.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response, accept_encoding, level=6, min_bytes=500):
+    """
+    Flask-Response in-place komprimieren (gzip/deflate), falls Client und Inhaltstyp passen.
+    Gestreamte Antworten (stream_template) bleiben gestreamt; send_file-Antworten werden nicht angefasst.
+    """
+    if (response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    encoding = choose_encoding(accept_encoding)
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+        response.set_data(compressor.compress(data) + compressor.flush())
+    response.headers["Content-Encoding"] = encoding
+    return response
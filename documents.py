@@ -0,0 +1,69 @@
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+
+HANDLE_RE = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+
+class DocumentStore:
+    """
+    Hochgeladene Datei und extrahiertes XML eines Web-Reports serverseitig ablegen.
+    Das Formular trägt nur noch den Handle (22 Zeichen, 128 Bit Zufall) statt des ganzen XML;
+    /download_corrected holt Datei und XML darüber. Einträge verfallen nach `ttl` Sekunden.
+    """
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+
+    def put(self, upload_path, xml, filename, raw=False):
+        """
+        Upload in den Store verschieben und das XML daneben ablegen. `raw`: das XML war nicht
+        eingebettet, sondern wurde als Roh-XML in der PDF gefunden (Reparatur). Rückgabe: Handle.
+        """
+        self.prune()
+        handle = secrets.token_urlsafe(16)
+        path = os.path.join(self.directory, handle)
+        os.makedirs(path)
+        upload_name = "upload" + os.path.splitext(upload_path)[1]
+        shutil.move(upload_path, os.path.join(path, upload_name))
+        with open(os.path.join(path, "invoice.xml"), "w", encoding="utf-8") as f:
+            f.write(xml)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"filename": filename, "upload": upload_name, "raw": raw, "created_at": time.time()}, f)
+        return handle
+
+    def get(self, handle):
+        """Dict mit upload_path, xml, filename und raw oder None (unbekannt, ungültig oder abgelaufen)."""
+        if not handle or not HANDLE_RE.match(handle):
+            return None
+        path = os.path.join(self.directory, handle)
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["created_at"] + self.ttl <= time.time():
+                return None
+            with open(os.path.join(path, "invoice.xml"), encoding="utf-8") as f:
+                xml = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return {"upload_path": os.path.join(path, meta["upload"]), "xml": xml, "filename": meta["filename"],
+                "raw": meta.get("raw", False)}
+
+    def prune(self):
+        """Abgelaufene Einträge löschen (nach mtime des Verzeichnisses)."""
+        cutoff = time.time() - self.ttl
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                except OSError:
+                    pass
@@ -0,0 +1,173 @@
+import glob
+import hashlib
+import json
+import os
+import re
+
+from lxml import etree
+
+XS = "{http://www.w3.org/2001/XMLSchema}"
+
+CACHE_VERSION = 1
+
+
+def _qname(node, value):
+    """QName-Attribut (z.B. "ram:IDType") im Kontext des Knotens zu "{ns}name" auflösen."""
+    prefix, _, local = value.rpartition(":")
+    return f"{{{node.nsmap.get(prefix or None, '')}}}{local}"
+
+
+def _load_schema_set(xsd_path):
+    """Haupt-XSD plus alle importierten/inkludierten Schemas einlesen: globale Typen und Elemente."""
+    types, elements = {}, {}
+    todo, seen = [os.path.abspath(xsd_path)], set()
+    while todo:
+        path = todo.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        schema = etree.parse(path).getroot()
+        target_ns = schema.get("targetNamespace", "")
+        qualified = schema.get("elementFormDefault") == "qualified"
+        for child in schema:
+            if child.tag in (XS + "import", XS + "include") and child.get("schemaLocation"):
+                todo.append(os.path.join(os.path.dirname(path), child.get("schemaLocation")))
+            elif child.tag == XS + "complexType" and child.get("name"):
+                types[f"{{{target_ns}}}{child.get('name')}"] = (child, target_ns, qualified)
+            elif child.tag == XS + "element" and child.get("name"):
+                elements[f"{{{target_ns}}}{child.get('name')}"] = (child, target_ns)
+    return types, elements
+
+
+def _child_elements(type_node, target_ns, qualified, types, elements):
+    """Direkte Kindelemente eines complexType als Liste von ("{ns}Name", Typ-QName oder None)."""
+    children = []
+    stack = list(type_node)
+    while stack:
+        node = stack.pop(0)
+        if node.tag == XS + "element":
+            if node.get("ref"):
+                ref = _qname(node, node.get("ref"))
+                decl = elements.get(ref)
+                type_name = decl[0].get("type") if decl is not None else None
+                children.append((ref, _qname(decl[0], type_name) if type_name else None))
+            else:
+                form_qualified = node.get("form", "qualified" if qualified else "unqualified") == "qualified"
+                name = f"{{{target_ns}}}{node.get('name')}" if form_qualified and target_ns else node.get("name")
+                type_name = node.get("type")
+                children.append((name, _qname(node, type_name) if type_name else node))
+        elif node.tag in (XS + "sequence", XS + "choice", XS + "all", XS + "complexContent"):
+            stack[0:0] = list(node)
+        elif node.tag in (XS + "extension", XS + "restriction") and node.getparent().tag == XS + "complexContent":
+            base = types.get(_qname(node, node.get("base")))
+            if base is not None and node.tag == XS + "extension":
+                children.extend(_child_elements(base[0], base[1], base[2], types, elements))
+            stack[0:0] = list(node)
+    return children
+
+
+def build_whitelist(xsd_path):
+    """
+    Alle erlaubten Elementpfade eines Profils ("/{ns}Root/{ns}Kind/...") aus dem XSD ableiten.
+
+    Rekursive Typen werden nur einmal pro Pfad expandiert.
+    """
+    types, elements = _load_schema_set(xsd_path)
+    paths = set()
+    root_ns = etree.parse(xsd_path).getroot().get("targetNamespace", "")
+    stack = []
+    for name, (decl, target_ns) in elements.items():
+        if target_ns == root_ns and decl.get("type"):
+            stack.append((f"/{name}", _qname(decl, decl.get("type")), ()))
+    while stack:
+        path, type_ref, ancestors = stack.pop()
+        paths.add(path)
+        if isinstance(type_ref, str):
+            if type_ref in ancestors or type_ref not in types:
+                continue
+            type_node, target_ns, qualified = types[type_ref]
+            ancestors = ancestors + (type_ref,)
+        elif type_ref is not None:
+            # anonymer Typ direkt am Element
+            type_node = type_ref.find(XS + "complexType")
+            if type_node is None:
+                continue
+            target_ns, qualified = type_node.getroottree().getroot().get("targetNamespace", ""), True
+        else:
+            continue
+        for child_name, child_type in _child_elements(type_node, target_ns, qualified, types, elements):
+            stack.append((f"{path}/{child_name}", child_type, ancestors))
+    return frozenset(paths)
+
+
+def _fingerprint(xsd_path):
+    """Hash über Name, Größe und mtime aller XSDs im Profilordner (Cache-Invalidierung)."""
+    digest = hashlib.sha1(str(CACHE_VERSION).encode())
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(xsd_path)), "*.xsd"))):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def load_whitelists(profile_xsds, cache_dir):
+    """
+    Whitelists aller Profile laden; aus `cache_dir` (JSON), sonst aus den XSDs bauen und cachen.
+
+    :param profile_xsds: Dict Profil → Pfad des Haupt-XSD
+    :return: Dict Profil → frozenset erlaubter Elementpfade
+    """
+    whitelists = {}
+    for profile, xsd_path in profile_xsds.items():
+        if not xsd_path:
+            continue
+        fingerprint = _fingerprint(xsd_path)
+        cache_path = os.path.join(cache_dir, f"element_whitelist_{profile}.json")
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("fingerprint") == fingerprint:
+                whitelists[profile] = frozenset(cached["paths"])
+                continue
+        except (OSError, ValueError):
+            pass
+        whitelists[profile] = build_whitelist(xsd_path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "paths": sorted(whitelists[profile])}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # Cache ist optional (z.B. schreibgeschütztes Verzeichnis)
+    return whitelists
+
+
+def find_nonstandard_elements(doc, allowed, prefixes=None):
+    """
+    Elemente des Dokuments, deren Pfad nicht in `allowed` liegt (ein Durchlauf, O(1) je Element).
+
+    Unterhalb eines nicht erlaubten Elements wird nichts weiter gemeldet.
+
+    :param prefixes: Dict Namespace → Prefix für die Anzeige
+    :return: Liste von Dicts (path, line)
+    """
+    prefixes = prefixes or {}
+
+    def display(path):
+        return "".join(
+            f"/{prefixes[ns]}:{local}" if ns in prefixes else f"/{local}"
+            for ns, local in re.findall(r"/(?:\{([^}]*)\})?([^/{]+)", path)
+        )
+
+    findings = []
+    stack = [(doc, "")]
+    while stack:
+        el, parent_path = stack.pop()
+        if not isinstance(el.tag, str):
+            continue  # Kommentare, Processing Instructions
+        path = f"{parent_path}/{el.tag}"
+        if path not in allowed:
+            findings.append({"path": display(path), "line": el.sourceline})
+            continue
+        stack.extend((child, path) for child in reversed(el))
+    return findings
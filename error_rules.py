@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+
+from format_router import SYNTAX_CII, SYNTAX_UBL_CREDITNOTE, SYNTAX_UBL_INVOICE
+
+RAM = "{urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100}"
+
+ALLOWED_XML_NAMES = [
+    "ZUGFeRD-invoice.xml", "zugferd-invoice.xml", "factur-x.xml", "xrechnung.xml"
+]
+
+ALL_MODES = frozenset({"quick", "standard", "full"})
+DEEP_MODES = frozenset({"standard", "full"})
+
+
+@dataclass(frozen=True)
+class ErrorRule:
+    """
+    Eine SON-Fehlerregel.
+
+    Dokumentregeln (``tag=None``) bekommen den RuleContext, Elementregeln (``tag`` = qualifizierter
+    Name) zusätzlich das Element. ``test`` liefert False/None (kein Fehler), True oder ein Dict mit
+    Platzhaltern für ``message``. Bei ``absent=True`` meldet die Regel, wenn kein Element den Test erfüllt.
+    """
+    code: str
+    message: str
+    test: object
+    severity: str = "error"
+    needs: str = "xml"  # "xml" oder "pdf"
+    tag: str = None
+    absent: bool = False
+    modes: frozenset = field(default=DEEP_MODES)
+
+
+@dataclass
+class RuleContext:
+    """Eingaben für die Regeln: geparstes XML (oder Parserfehler), Syntax und PDF-Inspektionsdaten."""
+    xml: str = None
+    doc: object = None
+    parse_error: str = None
+    syntax: str = None
+    pdf: dict = None
+
+
+ERROR_RULES = []
+
+
+def register_rule(rule):
+    """Regel hinten anhängen; die Reihenfolge bestimmt die Reihenfolge der Meldungen."""
+    ERROR_RULES.append(rule)
+    return rule
+
+
+def _pdf_ok(ctx):
+    return ctx.pdf.get("error") is None
+
+
+# --- E0051: PDF-Prüfungen ohne VeraPDF ---
+register_rule(ErrorRule(
+    "E0051", "E0051: PDF konnte nicht geprüft werden. ({error})",
+    lambda ctx: not _pdf_ok(ctx) and {"error": ctx.pdf["error"]},
+    needs="pdf", modes=ALL_MODES,
+))
+register_rule(ErrorRule(
+    "E0051", "E0051: PDF enthält keine eingebettete Rechnung (weder XML, noch irgendetwas anderes).",
+    lambda ctx: _pdf_ok(ctx) and ctx.pdf["embfile_count"] == 0,
+    needs="pdf", modes=ALL_MODES,
+))
+register_rule(ErrorRule(
+    "E0051", "E0051: PDF hat PDF-Version: ({pdf_version}). Bei FACTUR-X sagt die Norm 1.7",
+    lambda ctx: _pdf_ok(ctx) and "1.7" not in str(ctx.pdf["pdf_version"] or "None")
+    and {"pdf_version": ctx.pdf["pdf_version"]},
+    needs="pdf",
+))
+register_rule(ErrorRule(
+    "E0051", "E0051: PDF scheint kein PDF/A-3 zu sein (Metadatenprüfung, unsicher).",
+    lambda ctx: _pdf_ok(ctx) and not ctx.pdf["pdfa3_hint"] and not ctx.pdf["custom_xmp"],
+    severity="warning", needs="pdf",
+))
+register_rule(ErrorRule(
+    "E0051",
+    "E0051: Filename der eingebetteten Rechnung ist nicht korrekt. "
+    "Gefunden: {name}, erlaubt: " + ", ".join(ALLOWED_XML_NAMES),
+    lambda ctx: _pdf_ok(ctx) and ctx.pdf["embfile_count"] > 0
+    and ctx.pdf["embedded_name"] not in ALLOWED_XML_NAMES and {"name": ctx.pdf["embedded_name"]},
+    needs="pdf", modes=ALL_MODES,
+))
+
+# --- E0070: Rechnungsnummer/Charge auf Preisebene ---
+register_rule(ErrorRule(
+    "E0070", "E0070: Fehlende Rechnungsnummer im Dokument.",
+    lambda el, ctx: bool(el.text and el.text.strip()),
+    tag=RAM + "ID", absent=True,
+))
+register_rule(ErrorRule(
+    "E0070", "E0070: Charge auf Preisebene (unter GrossPrice) gefunden.",
+    lambda el, ctx: next(el.iterancestors(RAM + "GrossPrice"), None) is not None,
+    tag=RAM + "Charge",
+))
+
+# --- E0053: XML/Format-Prüfung ---
+register_rule(ErrorRule(
+    "E0053", "E0053: Invalides XML.",
+    lambda ctx: ctx.parse_error is not None,
+    modes=ALL_MODES,
+))
+register_rule(ErrorRule(
+    "E0053", "E0053: Ungültiges XRechnungs-Format (Root-Tag fehlt).",
+    lambda ctx: ctx.syntax != SYNTAX_CII,
+    modes=ALL_MODES,
+))
+register_rule(ErrorRule(
+    "E0053", "E0053: PEPPOL UBL-Format erkannt (nicht zulässig für XRechnung/Factur-X-Workflow).",
+    lambda ctx: ctx.syntax in (SYNTAX_UBL_INVOICE, SYNTAX_UBL_CREDITNOTE),
+))
+
+# --- E0054: Nach Extraktion kein XML ---
+register_rule(ErrorRule(
+    "E0054", "E0054: Extrahiertes Objekt ist keine als XML klassifizierbare Datei (z.B. fehlendes End-Tag).",
+    lambda ctx: ctx.parse_error is not None,
+    modes=ALL_MODES,
+))
+
+
+def run_rules(ctx, mode="full", rules=None):
+    """
+    Wertet alle Regeln der Stufe `mode` aus.
+
+    Dokumentregeln laufen je einmal, Elementregeln gemeinsam in einem einzigen Durchlauf über den
+    Baum (lineare Laufzeit, keine Regex-Backtracking-Gefahr). Jede Regel meldet höchstens einmal.
+
+    :return: Liste von Dicts (code, severity, message) in Registrierungsreihenfolge
+    """
+    rules = ERROR_RULES if rules is None else rules
+    results = {}
+    by_tag = {}
+    for idx, rule in enumerate(rules):
+        if mode not in rule.modes:
+            continue
+        if rule.needs == "pdf" and ctx.pdf is None:
+            continue
+        if rule.needs == "xml" and ctx.xml is None:
+            continue
+        if rule.tag is None:
+            results[idx] = rule.test(ctx)
+        else:
+            by_tag.setdefault(rule.tag, []).append(idx)
+            results[idx] = False
+
+    pending = {idx for indices in by_tag.values() for idx in indices}
+    if pending and ctx.doc is not None:
+        for el in ctx.doc.iter(*by_tag):
+            for idx in by_tag[el.tag]:
+                if idx in pending and rules[idx].test(el, ctx):
+                    results[idx] = True
+                    pending.discard(idx)
+            if not pending:
+                break
+
+    findings = []
+    for idx, outcome in sorted(results.items()):
+        rule = rules[idx]
+        if rule.tag is not None:
+            if ctx.doc is None:
+                continue
+            if rule.absent:
+                outcome = not outcome
+        if not outcome:
+            continue
+        message = rule.message.format(**outcome) if isinstance(outcome, dict) else rule.message
+        findings.append({"code": rule.code, "severity": rule.severity, "message": message})
+    return findings
@@ -0,0 +1,62 @@
+from lxml import etree
+
+# Syntax-Klassen für das Routing
+SYNTAX_CII = "CII"
+SYNTAX_UBL_INVOICE = "UBL-Invoice"
+SYNTAX_UBL_CREDITNOTE = "UBL-CreditNote"
+SYNTAX_UNKNOWN = "UNKNOWN"
+
+ROOT_SYNTAX = {
+    "{urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100}CrossIndustryInvoice": SYNTAX_CII,
+    "{urn:oasis:names:specification:ubl:schema:xsd:Invoice-2}Invoice": SYNTAX_UBL_INVOICE,
+    "{urn:oasis:names:specification:ubl:schema:xsd:CreditNote-2}CreditNote": SYNTAX_UBL_CREDITNOTE,
+}
+
+SYNTAX_LABELS = {
+    SYNTAX_CII: "CII (CrossIndustryInvoice – z.B. XRechnung, Factur-X, ZUGFeRD)",
+    SYNTAX_UBL_INVOICE: "UBL Invoice-2",
+    SYNTAX_UBL_CREDITNOTE: "UBL CreditNote-2",
+}
+
+# Prolog + Root-Start-Tag liegen praktisch immer in den ersten Kilobytes
+SNIFF_CHUNK = 4096
+SNIFF_LIMIT = 64 * 1024
+
+
+def sniff_root(data, limit=SNIFF_LIMIT):
+    """
+    Liest nur Prolog und Root-Start-Tag (inkrementell, höchstens `limit` Zeichen/Bytes).
+
+    :param data: XML als str oder bytes
+    :return: Qualifizierter Root-Tag ("{ns}Name") oder None, falls nicht erkennbar
+    """
+    if not data:
+        return None
+    if isinstance(data, str):
+        data = data.lstrip("\ufeff")  # BOM aus einem mit "utf-8" statt "utf-8-sig" dekodierten Text
+    parser = etree.XMLPullParser(events=("start",), resolve_entities=False, no_network=True)
+    try:
+        for offset in range(0, min(len(data), limit), SNIFF_CHUNK):
+            parser.feed(data[offset:offset + SNIFF_CHUNK])
+            for _, element in parser.read_events():
+                return element.tag
+    except etree.XMLSyntaxError:
+        pass
+    return None
+
+
+def classify_syntax(data):
+    """Syntax eines Dokuments anhand des Root-Elements: CII, UBL-Invoice, UBL-CreditNote oder UNKNOWN."""
+    return ROOT_SYNTAX.get(sniff_root(data), SYNTAX_UNKNOWN)
+
+
+def describe_syntax(syntax, data=None):
+    """Anzeigetext für den erkannten Standard (PEPPOL-Hinweis nur im gelesenen Kopfbereich)."""
+    if syntax in SYNTAX_LABELS:
+        return SYNTAX_LABELS[syntax]
+    head = data[:SNIFF_LIMIT] if data else ""
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", errors="replace")
+    if "peppol" in head.lower():
+        return "PEPPOL UBL"
+    return "Unbekannt"
@@ -0,0 +1,31 @@
+# gunicorn -c gunicorn.conf.py app:app
+# Lädt die App im Master (preload) und wärmt Schemas/XSLT/Codelisten vor dem Fork auf,
+# damit alle Worker diese Objekte per Copy-on-Write teilen.
+import json
+import os
+
+import admission
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# Threads statt Sync-Worker: SSE-Streams (/api/jobs/<id>/events) und lange Prüfungen blockieren
+# nicht den Heartbeat, der Arbiter beendet den Worker (samt Job-Threads) also nicht nach `timeout`.
+worker_class = "gthread"
+# Die Admission-Pools gelten pro Prozess; ohne genug Threads kommt nie ein Request in die
+# Warteschlange, und es gäbe weder 429 noch 503 (Default: alle Pool-Plätze + 4)
+threads = int(os.environ.get("SOVALIDATOR_THREADS") or admission.request_threads(admission.settings_from_env()))
+timeout = int(os.environ.get("SOVALIDATOR_WORKER_TIMEOUT", "120"))
+preload_app = True
+
+
+def when_ready(server):
+    from app import memory_usage, warm_up
+    timings = warm_up()
+    server.log.info("warm_up: %s | master memory_kb: %s", json.dumps(timings), json.dumps(memory_usage()))
+
+
+def post_worker_init(worker):
+    from app import get_worker_pool, memory_usage
+    # Job-Worker-Threads starten, damit nach einem Neustart wartende Jobs weiterlaufen
+    get_worker_pool()
+    worker.log.info("worker %s memory_kb: %s", worker.pid, json.dumps(memory_usage()))
@@ -0,0 +1,259 @@
+"""
+Hot-Folder: überwacht ein Verzeichnis (rekursiv) und validiert neue PDF/XML-Rechnungen.
+
+python -m hotfolder IN_DIR OUT_DIR [--mode standard] [--workers 4] [--interval 5] [--correct] [--once]
+
+Ergebnisse landen unter OUT_DIR/reports/<relativer Pfad>.json, mit --correct zusätzlich
+korrigierte PDFs unter OUT_DIR/corrected/. Gleicher Inhalt (SHA-256) wird nur einmal geprüft;
+der Checkpoint (Default OUT_DIR/.checkpoint.json) verhindert erneute Prüfung nach einem Neustart.
+Aus dem Repository-Wurzelverzeichnis aufrufen (app.py nutzt relative Pfade).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jsonlog
+
+log = logging.getLogger(jsonlog.LOGGER_NAME + ".hotfolder")
+
+EXTENSIONS = (".pdf", ".xml")
+# Fehlgeschlagene Dateien erneut versuchen: nach 30 s, dann doppelt so lange, höchstens stündlich
+RETRY_BASE = 30.0
+RETRY_MAX = 3600.0
+
+
+class Checkpoint:
+    """
+    Bereits verarbeitete Inhalte (SHA-256 → Ergebnis) und bekannte Dateien
+    (Pfad → [Größe, mtime_ns, SHA-256]), damit unveränderte Dateien nicht erneut gehasht werden.
+    Fehlgeschlagene Inhalte stehen getrennt unter `failures` (mit Versuchen und nächstem Termin)
+    und werden mit wachsendem Abstand erneut geprüft, bis es klappt.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.hashes = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.hashes = data.get("hashes", {})
+            self.failures = data.get("failed", {})
+        except (OSError, ValueError):
+            pass
+
+    def known_hash(self, rel_path, stat):
+        entry = self.files.get(rel_path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def remember_file(self, rel_path, stat, sha256):
+        with self._lock:
+            self.files[rel_path] = [stat.st_size, stat.st_mtime_ns, sha256]
+            self._dirty = True
+
+    def done(self, sha256, entry):
+        with self._lock:
+            self.hashes[sha256] = entry
+            self.failures.pop(sha256, None)
+            self._dirty = True
+
+    def failed(self, sha256, entry, now=None):
+        """Fehlschlag merken; der nächste Versuch folgt nach RETRY_BASE · 2^(Versuche-1) Sekunden."""
+        now = now or time.time()
+        with self._lock:
+            attempts = self.failures.get(sha256, {}).get("attempts", 0) + 1
+            self.failures[sha256] = dict(entry, attempts=attempts,
+                                         retry_at=now + min(RETRY_MAX, RETRY_BASE * 2 ** (attempts - 1)))
+            self._dirty = True
+
+    def due(self, sha256, now=None):
+        """True, wenn der Inhalt noch nie fehlgeschlagen ist oder sein nächster Versuch fällig ist."""
+        failure = self.failures.get(sha256)
+        return failure is None or failure["retry_at"] <= (now or time.time())
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"files": self.files, "hashes": self.hashes, "failed": self.failures})
+            self._dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def scan(in_dir, settle):
+    """Kandidaten (relativer Pfad, stat) unter `in_dir`; Dateien jünger als `settle` s werden evtl. noch geschrieben."""
+    now = time.time()
+    for root, dirs, files in os.walk(in_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if not name.lower().endswith(EXTENSIONS) or name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime >= settle:
+                yield os.path.relpath(path, in_dir), stat
+
+
+class HotFolder:
+    def __init__(self, in_dir, out_dir, mode="standard", nonstandard=False, workers=4,
+                 correct=False, checkpoint=None, settle=2.0):
+        import app
+        self.app = app
+        self.in_dir = in_dir
+        self.out_dir = out_dir
+        self.mode = mode
+        self.nonstandard = nonstandard
+        self.workers = workers
+        self.correct = correct
+        self.settle = settle
+        self.checkpoint = Checkpoint(checkpoint or os.path.join(out_dir, ".checkpoint.json"))
+
+    def pending(self):
+        """Neue Inhalte dieses Durchlaufs: SHA-256 → relativer Pfad (Duplikate nur einmal)."""
+        new = {}
+        for rel_path, stat in scan(self.in_dir, self.settle):
+            sha256 = self.checkpoint.known_hash(rel_path, stat)
+            if sha256 is None:
+                sha256 = self.app.file_sha256(os.path.join(self.in_dir, rel_path))
+                self.checkpoint.remember_file(rel_path, stat, sha256)
+            if sha256 in self.checkpoint.hashes or sha256 in new:
+                log.debug("Duplikat übersprungen", extra={"file": rel_path, "sha256": sha256})
+                continue
+            if not self.checkpoint.due(sha256):
+                continue  # fehlgeschlagen, nächster Versuch noch nicht fällig
+            new[sha256] = rel_path
+        return new
+
+    def process(self, sha256, rel_path):
+        path = os.path.join(self.in_dir, rel_path)
+        is_pdf = rel_path.lower().endswith(".pdf")
+        t0 = time.perf_counter()
+        try:
+            report = self.app.run_validation(path, is_pdf, self.mode, self.nonstandard)
+            self.app.record_result(report, sha256, "hotfolder")
+            entry = {"file": rel_path, "accepted": report["accepted"], "fatal": report["fatal"]}
+            # Positionskorrekturen wie im Web-UI: Label|start|ende|Vorschlag (Positionen in report["xml"])
+            corrections = [f"{f['label']}|{f['start']}|{f['end']}|{f['suggestion']}"
+                           for f in report["codelist_errors"] if f["suggestion"]]
+            if self.correct and is_pdf and report["xml"] and corrections:
+                corrected_path = self._output_path("corrected", rel_path, "_corrected.pdf")
+                if self.app.write_corrected_pdf(path, report["xml"], corrections, corrected_path) is not None:
+                    entry["corrected"] = os.path.relpath(corrected_path, self.out_dir)
+            public = self.app.public_report(report, os.path.basename(rel_path))
+            public["sha256"] = sha256
+            public["source"] = rel_path
+            report_path = self._output_path("reports", rel_path, ".json")
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(public, f, ensure_ascii=False, indent=2)
+            entry["report"] = os.path.relpath(report_path, self.out_dir)
+        except Exception as e:
+            log.error("Validierung fehlgeschlagen", exc_info=e, extra={"file": rel_path})
+            entry = {"file": rel_path, "error": str(e)}
+        entry["processed_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        # Nur Erfolge gelten als erledigt; Fehler (z.B. volle Platte) werden später erneut versucht
+        if "error" in entry:
+            self.checkpoint.failed(sha256, entry)
+        else:
+            self.checkpoint.done(sha256, entry)
+        log.info("Datei verarbeitet", extra={
+            "file": rel_path, "sha256": sha256, "accepted": entry.get("accepted"),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        })
+
+    def _output_path(self, kind, rel_path, suffix):
+        out_path = os.path.join(self.out_dir, kind, os.path.splitext(rel_path)[0] + suffix)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        return out_path
+
+    def run_once(self, executor):
+        """Ein Durchlauf: neue Dateien parallel prüfen, danach Checkpoint schreiben. Rückgabe: Anzahl."""
+        new = self.pending()
+        futures = [executor.submit(self.process, sha256, rel_path) for sha256, rel_path in new.items()]
+        for i, future in enumerate(futures, 1):
+            future.result()
+            if i % 100 == 0:
+                self.checkpoint.save()  # Zwischenstand bei großen Rückständen
+        self.checkpoint.save()
+        return len(new)
+
+    def run(self, interval=5.0, once=False, use_inotify=False):
+        self.app.warm_up(freeze=False)
+        waiter = _inotify_waiter(self.in_dir) if use_inotify else None
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sovalidator-hotfolder") as executor:
+            while True:
+                count = self.run_once(executor)
+                if count:
+                    log.info("Durchlauf abgeschlossen", extra={"files": count})
+                if once:
+                    return
+                if waiter:
+                    waiter(interval)
+                else:
+                    time.sleep(interval)
+
+
+def _inotify_waiter(in_dir):
+    """
+    Wartefunktion auf Dateiereignisse (Paket inotify_simple, nur Linux); ohne das Paket wird gepollt.
+    Es wird nur das Wurzelverzeichnis beobachtet; Unterordner erfasst der nächste Scan.
+    """
+    try:
+        from inotify_simple import INotify, flags
+    except ImportError:
+        log.warning("inotify_simple nicht installiert, verwende Polling")
+        return None
+    inotify = INotify()
+    inotify.add_watch(in_dir, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+
+    def wait(timeout):
+        inotify.read(timeout=int(timeout * 1000))
+
+    return wait
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m hotfolder")
+    parser.add_argument("in_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--mode", choices=["quick", "standard", "full"], default="standard")
+    parser.add_argument("--nonstandard", action="store_true", help="Nicht-standardisierte Tags melden")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=5.0, help="Sekunden zwischen zwei Scans")
+    parser.add_argument("--settle", type=float, default=2.0, help="Dateien erst nach so vielen Sekunden ohne Änderung prüfen")
+    parser.add_argument("--correct", action="store_true", help="Korrigierte PDFs (Codelisten-Vorschläge) schreiben")
+    parser.add_argument("--checkpoint", help="Checkpoint-Datei (Default OUT_DIR/.checkpoint.json)")
+    parser.add_argument("--inotify", action="store_true", help="Auf Dateiereignisse warten statt zu pollen (Linux)")
+    parser.add_argument("--once", action="store_true", help="Nur einen Durchlauf, dann beenden")
+    args = parser.parse_args(argv)
+
+    hot_folder = HotFolder(args.in_dir, args.out_dir, args.mode, args.nonstandard, args.workers,
+                           args.correct, args.checkpoint, args.settle)
+    # Nach dem Import von app (create_app stellt den Logger auf den Web-Default): Daemon loggt ab INFO
+    jsonlog.configure_logging(level=os.environ.get("SOVALIDATOR_LOG_LEVEL", "INFO"))
+    try:
+        hot_folder.run(args.interval, args.once, args.inotify)
+    except KeyboardInterrupt:
+        hot_folder.checkpoint.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
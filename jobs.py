@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    sha256      TEXT NOT NULL,
+    mode        TEXT NOT NULL,
+    nonstandard INTEGER NOT NULL,
+    filename    TEXT,
+    file_path   TEXT,
+    is_pdf      INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    stage       TEXT,
+    progress    TEXT,
+    result      TEXT,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    expires_at  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (sha256, mode, nonstandard);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Persistente Job-Queue in SQLite (eine Datei, von allen gunicorn-Workern gemeinsam genutzt).
+
+    Jobs mit gleichem Inhalt (SHA-256), gleicher Stufe und gleichen Optionen werden zusammengelegt,
+    solange der vorhandene Job nicht fehlgeschlagen und sein Ergebnis nicht abgelaufen ist.
+    Ergebnisse bleiben `ttl` Sekunden nach Abschluss abrufbar.
+    """
+
+    def __init__(self, db_path, ttl=3600, stale_after=600):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.stale_after = stale_after
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Schreibtransaktion; BEGIN IMMEDIATE serialisiert Claim/Dedup über Prozesse hinweg."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def submit(self, sha256, mode, nonstandard, filename, file_path, is_pdf):
+        """Job anlegen oder vorhandenen gleichen Job wiederverwenden. Rückgabe: (job_id, dedupliziert)."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE sha256 = ? AND mode = ? AND nonstandard = ? AND status != ?"
+                " AND (expires_at IS NULL OR expires_at > ?) ORDER BY created_at DESC LIMIT 1",
+                (sha256, mode, int(nonstandard), STATUS_FAILED, now),
+            ).fetchone()
+            if row:
+                return row["id"], True
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, sha256, mode, nonstandard, filename, file_path, is_pdf, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, sha256, mode, int(nonstandard), filename, file_path, int(is_pdf), STATUS_QUEUED, now),
+            )
+        return job_id, False
+
+    def claim(self):
+        """Ältesten wartenden Job übernehmen (oder None)."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                         (STATUS_RUNNING, time.time(), row["id"]))
+        return dict(row)
+
+    def progress(self, job_id, stage, partial):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET stage = ?, progress = ? WHERE id = ?",
+                         (stage, json.dumps(partial), job_id))
+
+    def finish(self, job_id, result):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, result = ?, file_path = NULL, finished_at = ?, expires_at = ?"
+                " WHERE id = ?",
+                (STATUS_DONE, "done", json.dumps(result), now, now + self.ttl, job_id),
+            )
+
+    def fail(self, job_id, error):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, file_path = NULL, finished_at = ?, expires_at = ? WHERE id = ?",
+                (STATUS_FAILED, error, now, now + self.ttl, job_id),
+            )
+
+    def get(self, job_id):
+        """Job als Dict (progress/result bereits als JSON geparst) oder None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (row["expires_at"] and row["expires_at"] <= time.time()):
+            return None
+        job = dict(row)
+        for key in ("progress", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    def depth(self):
+        """Anzahl Jobs je Status (ohne abgelaufene), für die Metrik sovalidator_jobs."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE expires_at IS NULL OR expires_at > ? GROUP BY status",
+                (time.time(),),
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def maintain(self):
+        """
+        Abgelaufene Jobs löschen und hängengebliebene (Worker-Prozess gestorben) wieder einreihen.
+        Rückgabe: Dateipfade gelöschter Jobs, deren Upload noch auf Platte liegen kann.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?",
+                         (STATUS_QUEUED, STATUS_RUNNING, now - self.stale_after))
+            paths = [row["file_path"] for row in conn.execute(
+                "SELECT file_path FROM jobs WHERE expires_at <= ? AND file_path IS NOT NULL", (now,))]
+            conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+        return paths
+
+
+class WorkerPool:
+    """
+    Hintergrund-Threads, die Jobs aus der Queue holen und `handler(job, report_progress)` ausführen.
+    Wird pro Prozess gestartet (ensure_started prüft die PID), damit die Threads auch in
+    gunicorn-Workern laufen, die per preload aus dem Master geforkt wurden.
+    """
+
+    def __init__(self, queue, handler, size=2, poll_interval=0.5, maintain_interval=60, on_error=None):
+        self.queue = queue
+        self.handler = handler
+        self.size = size
+        self.poll_interval = poll_interval
+        self.maintain_interval = maintain_interval
+        self.on_error = on_error
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_maintenance = 0.0
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            for i in range(self.size):
+                threading.Thread(target=self._run, name=f"sovalidator-job-{i}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def notify(self):
+        """Worker sofort wecken (neuer Job), statt bis zum nächsten Poll zu warten."""
+        self.ensure_started()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._maybe_maintain()
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                job = None
+                if self.on_error:
+                    self.on_error(None, e)
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                result = self.handler(job, lambda stage, partial: self.queue.progress(job["id"], stage, partial))
+                self.queue.finish(job["id"], result)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(job, e)
+                self.queue.fail(job["id"], str(e))
+
+    def _maybe_maintain(self):
+        now = time.monotonic()
+        if now - self._last_maintenance < self.maintain_interval:
+            return
+        self._last_maintenance = now
+        try:
+            for path in self.queue.maintain():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        except sqlite3.Error as e:
+            if self.on_error:
+                self.on_error(None, e)
@@ -0,0 +1,107 @@
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOGGER_NAME = "sovalidator"
+# Attribute jedes LogRecord; alles andere kam über extra={...} und wird als Feld ausgegeben
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_settings = {"payloads": False, "payload_chars": 200}
+
+
+class JsonFormatter(logging.Formatter):
+    """Ein JSON-Objekt pro Zeile: ts, level, logger, msg und alle extra-Felder."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Schreibt Records in eine begrenzte Queue; ein Listener-Thread formatiert und schreibt sie.
+    Im Request-Thread kostet ein Log-Aufruf damit nur put_nowait(); ist die Queue voll,
+    wird verworfen und gezählt statt zu blockieren. Der Listener wird pro Prozess beim ersten
+    Log-Aufruf gestartet, damit er auch nach dem Fork der gunicorn-Worker (preload) läuft.
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._listener.stop)
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level=None, payloads=None, payload_chars=None, stream=None):
+    """
+    Logger "sovalidator" auf JSON-Zeilen über einen Queue-Handler einstellen (idempotent).
+
+    Defaults aus der Umgebung: SOVALIDATOR_LOG_LEVEL (WARNING), SOVALIDATOR_LOG_PAYLOADS (aus),
+    SOVALIDATOR_LOG_PAYLOAD_CHARS (200).
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    level = level or os.environ.get("SOVALIDATOR_LOG_LEVEL", "WARNING")
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if payloads is None:
+        payloads = os.environ.get("SOVALIDATOR_LOG_PAYLOADS", "") in ("1", "true", "on")
+    _settings["payloads"] = payloads
+    _settings["payload_chars"] = payload_chars or int(os.environ.get("SOVALIDATOR_LOG_PAYLOAD_CHARS", "200"))
+    if not any(isinstance(h, AsyncQueueHandler) for h in logger.handlers):
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(JsonFormatter())
+        logger.addHandler(AsyncQueueHandler(target))
+        logger.propagate = False
+    return logger
+
+
+def payload(data):
+    """
+    Log-Feld für ein (großes) Dokument: SHA-256-Präfix und Größe; Textauszug nur mit
+    SOVALIDATOR_LOG_PAYLOADS und auf SOVALIDATOR_LOG_PAYLOAD_CHARS Zeichen gekürzt.
+    """
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    info = {"sha256": hashlib.sha256(raw).hexdigest()[:16], "bytes": len(raw)}
+    if _settings["payloads"] and isinstance(data, str):
+        limit = _settings["payload_chars"]
+        info["excerpt"] = data[:limit] + ("…" if len(data) > limit else "")
+    return info
@@ -0,0 +1,214 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Aktiver Trace des laufenden Requests (None außerhalb eines Requests → span() ist ein No-op)
+_current_trace = contextvars.ContextVar("sovalidator_trace", default=None)
+
+
+class Histogram:
+    """Prometheus-Histogramm mit festen Buckets und optionalen Labels (threadsicher, prozesslokal)."""
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            label_str = ",".join(f'{label}="{value}"' for label, value in zip(self.labels, key))
+            sep = "," if label_str else ""
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_str}{sep}le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_str}{sep}le="+Inf"}} {count}')
+            suffix = f"{{{label_str}}}" if label_str else ""
+            lines.append(f"{self.name}_sum{suffix} {total:.6f}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus-Counter mit optionalen Labels (threadsicher, prozesslokal)."""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            label_str = ",".join(f'{label}="{v}"' for label, v in zip(self.labels, key))
+            lines.append(f"{self.name}{{{label_str}}} {value}" if label_str else f"{self.name} {value}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge/Counter, dessen Werte beim Scrape von `collect()` kommen ({Label-Tupel: Wert})."""
+
+    def __init__(self, name, help_text, labels, collect, kind="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            label_str = ",".join(f'{label}="{v}"' for label, v in zip(self.labels, key))
+            lines.append(f"{self.name}{{{label_str}}} {value}" if label_str else f"{self.name} {value}")
+        return lines
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "sovalidator_stage_duration_seconds", "Dauer einzelner Pipeline-Stufen.", LATENCY_BUCKETS, ("stage",))
+REQUEST_SECONDS = Histogram(
+    "sovalidator_request_duration_seconds", "Dauer der Requests.", LATENCY_BUCKETS, ("endpoint", "mode", "status"))
+DOCUMENT_BYTES = Histogram(
+    "sovalidator_document_bytes", "Größe des geprüften XML.", (1e3, 1e4, 1e5, 1e6, 5e6, 1e7, 5e7))
+LINE_ITEMS = Histogram(
+    "sovalidator_line_items", "Anzahl Rechnungspositionen.", (0, 1, 10, 100, 1000, 10000, 50000))
+CACHE_LOOKUPS = Counter(
+    "sovalidator_cache_lookups_total", "Zugriffe auf prozessweite Caches (Schemas, XSLT, Codelisten).",
+    ("cache", "result"))
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, DOCUMENT_BYTES, LINE_ITEMS, CACHE_LOOKUPS]
+
+
+def register(metric):
+    """Weitere Metrik (z.B. CallbackMetric) in /metrics aufnehmen."""
+    REGISTRY.append(metric)
+    return metric
+
+
+class Trace:
+    """Zeitmessung eines Requests: Spans je Stufe plus Attribute (Größe, Positionen, Cache-Treffer)."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.spans = []
+        self.attrs = {}
+
+    @contextmanager
+    def span(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((stage, time.perf_counter() - t0))
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Wert für den Server-Timing-Header (Dauer in ms)."""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans]
+        entries.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def start_trace(endpoint):
+    trace = Trace(endpoint)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(stage):
+    """Stufe im aktiven Trace messen; ohne Trace (CLI, Benchmarks) ohne Overhead."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(stage):
+        yield
+
+
+def annotate(**attrs):
+    """Attribute am aktiven Trace setzen (document_bytes, line_items, mode, ...)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def record_cache(cache, hit):
+    """Cache-Zugriff zählen und am aktiven Trace als cache_<name>=hit/miss vermerken."""
+    result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+    annotate(**{f"cache_{cache}": result})
+
+
+def finish_trace(trace, status):
+    """Trace in die Histogramme übernehmen und den aktiven Trace zurücksetzen."""
+    _current_trace.set(None)
+    for stage, seconds in trace.spans:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    REQUEST_SECONDS.observe(trace.total(), endpoint=trace.endpoint,
+                            mode=trace.attrs.get("mode", ""), status=status)
+    if "document_bytes" in trace.attrs:
+        DOCUMENT_BYTES.observe(trace.attrs["document_bytes"])
+    if "line_items" in trace.attrs:
+        LINE_ITEMS.observe(trace.attrs["line_items"])
+
+
+def timed_stream(chunks, stage):
+    """
+    Gestreamten Body durchreichen und die Zeit zum Erzeugen der Teile als Stufe `stage` zählen.
+    Läuft nach after_request (Trace ist dann schon abgeschlossen), daher direkt ins Histogramm.
+    """
+    seconds = 0.0
+    iterator = iter(chunks)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            seconds += time.perf_counter() - t0
+        yield chunk
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def render_prometheus():
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
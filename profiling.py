@@ -0,0 +1,159 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+
+PROFILERS = ("cprofile", "sample")
+# Gültige Capture-IDs (Schutz vor Pfadmanipulation beim Download)
+CAPTURE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{9}-[0-9a-f]{8}$")
+
+
+class SamplingProfiler:
+    """
+    Stichproben-Profiler für einen Thread: ein Hintergrund-Thread liest alle `interval` Sekunden
+    den Stack des Request-Threads (sys._current_frames) und zählt gleiche Stacks.
+    Kostet praktisch nichts im Request-Thread, deshalb kann er bei gesetzter Latenzschwelle
+    jeden Request begleiten; verworfen wird, was unter der Schwelle bleibt.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = {}
+        self.samples = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name="sovalidator-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def dump(self):
+        """Stacks im "collapsed"-Format (Zeile: frame;frame;frame anzahl), direkt für flamegraph.pl/speedscope."""
+        lines = [f"{stack} {count}" for stack, count in sorted(self.stacks.items(), key=lambda kv: -kv[1])]
+        return "\n".join(lines) + "\n", "folded.txt"
+
+
+class DeterministicProfiler:
+    """cProfile um den Request; deutlich teurer, deshalb nur auf ausdrückliche Anforderung."""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def dump(self):
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(60)
+        return out.getvalue(), "pstats.txt"
+
+    def dump_binary(self, path):
+        self._profile.dump_stats(path)
+
+
+def make_profiler(kind):
+    return DeterministicProfiler() if kind == "cprofile" else SamplingProfiler()
+
+
+class CaptureStore:
+    """
+    Ringpuffer auf Platte: je Capture eine JSON-Metadatei plus Profil-Datei(en) in `directory`.
+    Über `keep` hinaus werden die ältesten Captures gelöscht.
+    """
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, profiler, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        # Zeitstempel bis auf ms, damit die Sortierung nach ID der Entstehungsreihenfolge entspricht
+        capture_id = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}"
+        text, suffix = profiler.dump()
+        files = {"profile": f"{capture_id}.{suffix}"}
+        with open(os.path.join(self.directory, files["profile"]), "w", encoding="utf-8") as f:
+            f.write(text)
+        if isinstance(profiler, DeterministicProfiler):
+            files["pstats"] = f"{capture_id}.prof"
+            profiler.dump_binary(os.path.join(self.directory, files["pstats"]))
+        meta = dict(meta, id=capture_id, files=files, created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        tmp_path = os.path.join(self.directory, f"{capture_id}.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.directory, f"{capture_id}.json"))
+        self._prune()
+        return capture_id
+
+    def _prune(self):
+        with self._lock:
+            captures = sorted(self._capture_ids())
+            for capture_id in captures[:max(0, len(captures) - self.keep)]:
+                for name in os.listdir(self.directory):
+                    if name.startswith(capture_id + "."):
+                        try:
+                            os.remove(os.path.join(self.directory, name))
+                        except OSError:
+                            pass  # parallel von einem anderen Worker gelöscht
+
+    def _capture_ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [name[:-5] for name in names if name.endswith(".json") and CAPTURE_ID_RE.match(name[:-5])]
+
+    def list(self):
+        """Metadaten aller Captures, neueste zuerst."""
+        captures = []
+        for capture_id in sorted(self._capture_ids(), reverse=True):
+            try:
+                with open(os.path.join(self.directory, f"{capture_id}.json"), encoding="utf-8") as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return captures
+
+    def file_path(self, capture_id, kind="profile"):
+        """Pfad einer Profil-Datei oder None (unbekannte ID/Art)."""
+        if not CAPTURE_ID_RE.match(capture_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{capture_id}.json"), encoding="utf-8") as f:
+                name = json.load(f)["files"].get(kind)
+        except (OSError, ValueError, KeyError):
+            return None
+        return os.path.join(self.directory, name) if name else None
@@ -0,0 +1,212 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validations (
+    id               INTEGER PRIMARY KEY,
+    invoice_sha256   TEXT NOT NULL,
+    seller_id        TEXT,
+    profile          TEXT,
+    codelist_version TEXT NOT NULL,
+    mode             TEXT NOT NULL,
+    accepted         INTEGER NOT NULL,
+    fatal            TEXT,
+    source           TEXT,
+    created_at       REAL NOT NULL,
+    day              INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS validations_key ON validations (invoice_sha256, mode, codelist_version);
+CREATE INDEX IF NOT EXISTS validations_seller ON validations (seller_id, day);
+CREATE INDEX IF NOT EXISTS validations_profile ON validations (profile, day);
+
+CREATE TABLE IF NOT EXISTS findings (
+    validation_id INTEGER NOT NULL REFERENCES validations (id) ON DELETE CASCADE,
+    kind          TEXT NOT NULL,
+    code          TEXT NOT NULL,
+    value         TEXT
+);
+CREATE INDEX IF NOT EXISTS findings_validation ON findings (validation_id);
+CREATE INDEX IF NOT EXISTS findings_code ON findings (kind, code);
+
+-- Vorab aggregiert: Fehler je Tag, Lieferant und Code; "Top-Fehler der letzten 90 Tage"
+-- liest nur die Rollups (Zeitraum × Lieferanten × Codes statt Millionen Findings).
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    day       INTEGER NOT NULL,
+    seller_id TEXT NOT NULL,
+    profile   TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    code      TEXT NOT NULL,
+    count     INTEGER NOT NULL,
+    PRIMARY KEY (day, seller_id, profile, kind, code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollup_seller ON rollup_daily (seller_id, day);
+
+-- Dasselbe je Kalendermonat: lange Zeiträume lesen volle Monate hier und nur die Randtage aus rollup_daily
+CREATE TABLE IF NOT EXISTS rollup_monthly (
+    month     INTEGER NOT NULL,
+    seller_id TEXT NOT NULL,
+    profile   TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    code      TEXT NOT NULL,
+    count     INTEGER NOT NULL,
+    PRIMARY KEY (month, seller_id, profile, kind, code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollup_monthly_seller ON rollup_monthly (seller_id, month);
+"""
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def month_of(day):
+    """Tag seit 1970-01-01 → Monat als JJJJMM."""
+    date = _EPOCH + datetime.timedelta(days=day)
+    return date.year * 100 + date.month
+
+
+def split_range(since, until):
+    """
+    Tagesbereich [since, until] in volle Kalendermonate und Randtage aufteilen.
+    Rückgabe: (Monate, [(von, bis), ...] Tagesbereiche).
+    """
+    months, day_ranges = [], []
+    day = since
+    while day <= until:
+        date = _EPOCH + datetime.timedelta(days=day)
+        next_month = (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        month_end = (next_month - _EPOCH).days - 1
+        if date.day == 1 and month_end <= until:
+            months.append(date.year * 100 + date.month)
+        else:
+            day_ranges.append((day, min(month_end, until)))
+        day = month_end + 1
+    return months, day_ranges
+
+
+KIND_CODELIST = "codelist"
+KIND_ERRORCODE = "errorcode"
+KIND_SCHEMATRON = "schematron"
+UNKNOWN_SELLER = "?"
+
+
+def findings_from_report(report):
+    """(kind, code, value) je Fehler: Codelisten-Label, E00xx-Code, Schematron-Meldung."""
+    rows = [(KIND_CODELIST, f["label"], f["value"]) for f in report.get("codelist_errors", [])]
+    rows += [(KIND_ERRORCODE, f["code"], f["message"]) for f in report.get("error_findings", [])
+             if f["severity"] == "error"]
+    rows += [(KIND_SCHEMATRON, "schematron", message[:500]) for message in report.get("schematron", [])]
+    return rows
+
+
+class ResultStore:
+    """
+    Ablage aller Validierungsergebnisse in SQLite, Schlüssel (Rechnungs-Hash, Stufe, Codelisten-Version).
+    Eine erneute Prüfung derselben Rechnung mit gleicher Stufe und Codeliste wird nicht doppelt gezählt.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Eine Verbindung pro Thread (und Prozess) wiederverwenden
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        yield conn
+
+    def record(self, report, invoice_sha256, codelist_version, source=None, now=None):
+        """Report speichern und Rollups fortschreiben. Rückgabe: (validation_id, neu angelegt)."""
+        now = now or time.time()
+        day = int(now // 86400)
+        seller_id = report.get("seller_id") or UNKNOWN_SELLER
+        profile = report.get("profile") or ""
+        findings = findings_from_report(report)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO validations (invoice_sha256, seller_id, profile, codelist_version, mode,"
+                    " accepted, fatal, source, created_at, day) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (invoice_sha256, seller_id, profile, codelist_version, report["mode"],
+                     int(bool(report.get("accepted"))), report.get("fatal"), source, now, day),
+                )
+                if cur.rowcount == 0:
+                    row = conn.execute(
+                        "SELECT id FROM validations WHERE invoice_sha256 = ? AND mode = ? AND codelist_version = ?",
+                        (invoice_sha256, report["mode"], codelist_version),
+                    ).fetchone()
+                    conn.execute("COMMIT")
+                    return row["id"], False
+                validation_id = cur.lastrowid
+                conn.executemany(
+                    "INSERT INTO findings (validation_id, kind, code, value) VALUES (?, ?, ?, ?)",
+                    [(validation_id, kind, code, value) for kind, code, value in findings],
+                )
+                counts = {}
+                for kind, code, _ in findings:
+                    counts[(kind, code)] = counts.get((kind, code), 0) + 1
+                rollup = [(seller_id, profile, kind, code, n) for (kind, code), n in counts.items()]
+                conn.executemany(
+                    "INSERT INTO rollup_daily (day, seller_id, profile, kind, code, count) VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (day, seller_id, profile, kind, code) DO UPDATE SET count = count + excluded.count",
+                    [(day, *row) for row in rollup],
+                )
+                conn.executemany(
+                    "INSERT INTO rollup_monthly (month, seller_id, profile, kind, code, count) VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (month, seller_id, profile, kind, code) DO UPDATE SET count = count + excluded.count",
+                    [(month_of(day), *row) for row in rollup],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return validation_id, True
+
+    def top_errors(self, days=90, seller_id=None, kind=None, profile=None, limit=20, now=None):
+        """Häufigste Fehler je Lieferant in den letzten `days` Tagen (aus rollup_monthly/rollup_daily)."""
+        until = int((now or time.time()) // 86400)
+        months, day_ranges = split_range(until - days + 1, until)
+        filters, filter_params = "", []
+        for column, value in (("seller_id", seller_id), ("kind", kind), ("profile", profile)):
+            if value is not None:
+                filters += f" AND {column} = ?"
+                filter_params.append(value)
+        parts, params = [], []
+        if months:
+            parts.append(f"SELECT seller_id, kind, code, count FROM rollup_monthly"
+                         f" WHERE month IN ({','.join('?' * len(months))}){filters}")
+            params += [*months, *filter_params]
+        for first, last in day_ranges:
+            parts.append(f"SELECT seller_id, kind, code, count FROM rollup_daily WHERE day BETWEEN ? AND ?{filters}")
+            params += [first, last, *filter_params]
+        if not parts:
+            return []  # leerer Zeitraum
+        sql = (
+            f"SELECT seller_id, kind, code, SUM(count) AS count FROM ({' UNION ALL '.join(parts)})"
+            " GROUP BY seller_id, kind, code ORDER BY count DESC LIMIT ?"
+        )
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, (*params, limit))]
+
+    def invoice(self, invoice_sha256):
+        """Alle gespeicherten Prüfungen einer Rechnung samt Findings."""
+        with self._connect() as conn:
+            validations = [dict(row) for row in conn.execute(
+                "SELECT * FROM validations WHERE invoice_sha256 = ? ORDER BY created_at", (invoice_sha256,))]
+            for validation in validations:
+                validation["findings"] = [dict(row) for row in conn.execute(
+                    "SELECT kind, code, value FROM findings WHERE validation_id = ?", (validation["id"],))]
+        return validations
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # app.py lädt Schemas, XSLT und Codelisten über relative Pfade
+# Caches, Secret-Key, Job-Queue und Ergebnis-DB nicht im Arbeitsverzeichnis ablegen
+os.environ.setdefault("SOVALIDATOR_CACHE_DIR", tempfile.mkdtemp(prefix="sovalidator-tests-"))
+
+from benchmarks.corpus import embed_in_pdf, generate_invoice  # noqa: E402
+
+
+@pytest.fixture
+def invoice_xml():
+    xml, _ = generate_invoice("EN16931", line_items=3)
+    return xml
+
+
+def write_pdf(path, xml, name="factur-x.xml"):
+    """Einseitige PDF mit `xml` als Anhang `name` (ohne PDF/A-Metadaten, falls name abweicht)."""
+    if name == "factur-x.xml":
+        embed_in_pdf(xml, str(path))
+        return str(path)
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    doc.new_page()
+    doc.embfile_add(name, xml.encode("utf-8"), filename=name)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
@@ -0,0 +1,63 @@
+import pytest
+
+import app
+
+
+def client(tmp_path, **config):
+    return app.create_app({"PROFILE_DIR": str(tmp_path / "profiles"), **config}).test_client()
+
+
+def get(client, path="/debug/profiles", remote_addr="127.0.0.1", **headers):
+    return client.get(path, headers=headers, environ_base={"REMOTE_ADDR": remote_addr})
+
+
+def test_debug_requires_token_by_default(tmp_path):
+    c = client(tmp_path)
+    assert get(c).status_code == 404
+    assert get(c, Authorization="Bearer geheim").status_code == 404
+
+
+def test_debug_with_token(tmp_path):
+    c = client(tmp_path, DEBUG_TOKEN="geheim")
+    assert get(c, Authorization="Bearer geheim", remote_addr="203.0.113.7").status_code == 200
+    assert get(c, Authorization="Bearer falsch").status_code == 404
+    assert get(c, Authorization="Bearer gehéim").status_code == 404
+
+
+@pytest.mark.parametrize("config, status", [
+    ({"DEBUG_ALLOW_LOCAL": True}, 404),                        # Opt-in ohne Proxy-Angabe reicht nicht
+    ({"DEBUG_ALLOW_LOCAL": True, "TRUSTED_PROXIES": 0}, 200),  # direkt erreichbar, kein Proxy
+    ({"TRUSTED_PROXIES": 0}, 404),                             # Proxy-Angabe ohne Opt-in
+])
+def test_debug_local_fallback_is_opt_in(tmp_path, config, status):
+    assert get(client(tmp_path, **config)).status_code == status
+
+
+def test_debug_local_fallback_behind_proxy(tmp_path):
+    c = client(tmp_path, DEBUG_ALLOW_LOCAL=True, TRUSTED_PROXIES=1)
+    # Proxy auf localhost leitet einen externen Client weiter
+    assert get(c, **{"X-Forwarded-For": "203.0.113.7"}).status_code == 404
+    assert get(c, **{"X-Forwarded-For": "127.0.0.1"}).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/api/results/top-errors", "/api/results/invoice/" + "0" * 64])
+def test_results_disabled_without_token(tmp_path, path):
+    # auch localhost und freigegebene Diagnose-Endpunkte öffnen die Ergebnis-Abfragen nicht
+    c = client(tmp_path, DEBUG_ALLOW_LOCAL=True, TRUSTED_PROXIES=0, DEBUG_TOKEN="geheim")
+    assert get(c, path).status_code == 404
+    assert get(c, path, Authorization="Bearer geheim").status_code == 404
+
+
+def test_results_require_token(tmp_path):
+    c = client(tmp_path, RESULTS_TOKEN="auswertung")
+    assert get(c, "/api/results/top-errors").status_code == 401
+    assert get(c, "/api/results/top-errors", Authorization="Bearer falsch").status_code == 401
+    assert get(c, "/api/results/top-errors", Authorization="Bearer auswertung").status_code == 200
+
+
+@pytest.mark.parametrize("query", ["days=0", "days=-5", "days=abc", "limit=0"])
+def test_results_reject_invalid_range(tmp_path, query):
+    c = client(tmp_path, RESULTS_TOKEN="auswertung")
+    response = get(c, "/api/results/top-errors?" + query, Authorization="Bearer auswertung")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
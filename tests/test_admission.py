@@ -0,0 +1,60 @@
+import io
+import threading
+import time
+
+import admission
+import app
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "Zustand nicht erreicht"
+        time.sleep(0.005)
+
+
+def test_concurrent_uploads_are_rejected(tmp_path, monkeypatch, invoice_xml):
+    # cheap: 1 parallel, 1 wartend, 0,3 s Wartezeit
+    controller = admission.AdmissionController(cheap=(1, 1, 0.3), expensive=(1, 1, 0.3), expensive_ms=1e9)
+    pool = controller.pools["cheap"]
+    release = threading.Event()
+    real_validation = app.run_validation
+
+    def slow_validation(*args, **kwargs):
+        release.wait(10)
+        return real_validation(*args, **kwargs)
+
+    monkeypatch.setattr(app, "get_admission", lambda: controller)
+    monkeypatch.setattr(app, "run_validation", slow_validation)
+    flask_app = app.create_app({"DOCUMENT_DIR": str(tmp_path / "documents")})
+    data = invoice_xml.encode("utf-8")
+    responses = {}
+
+    def post(name):
+        responses[name] = flask_app.test_client().post(
+            "/api/validate", data={"pdf_file": (io.BytesIO(data), "rechnung.xml"), "mode": "quick"})
+
+    running = threading.Thread(target=post, args=("running",))
+    running.start()
+    wait_until(lambda: pool.running == 1)
+    waiting = threading.Thread(target=post, args=("waiting",))
+    waiting.start()
+    wait_until(lambda: pool.waiting == 1)
+
+    post("overflow")  # Warteschlange voll
+    waiting.join(5)   # Wartezeit abgelaufen, die erste Prüfung läuft noch
+    release.set()
+    running.join(5)
+
+    assert responses["overflow"].status_code == 429
+    assert responses["waiting"].status_code == 503
+    assert int(responses["waiting"].headers["Retry-After"]) >= 1
+    assert responses["running"].status_code == 200
+    assert pool.snapshot()["rejected"] == {429: 1, 503: 1}
+
+
+def test_worker_threads_cover_all_pool_slots():
+    settings = admission.settings_from_env({"SOVALIDATOR_CHEAP_CONCURRENCY": "2", "SOVALIDATOR_CHEAP_QUEUE": "3"})
+    assert settings["cheap"] == (2, 3, 10.0)
+    # 2 + 3 (cheap) + 1 + 2 (expensive) + 4 Reserve
+    assert admission.request_threads(settings) == 12
@@ -0,0 +1,13 @@
+import app
+from benchmarks.corpus import generate_invoice
+from benchmarks.stages import _prepare
+
+
+def test_prepared_corrections_change_the_xml(tmp_path):
+    xml, _ = generate_invoice("EN16931", line_items=20, invalid_rate=0.5, seed=1)
+    path = tmp_path / "invoice.xml"
+    path.write_text(xml, encoding="utf-8")
+    ctx = _prepare(app, str(path), {})
+    assert ctx["corrections"]
+    assert ctx["corrected"] != ctx["xml"]
+    assert len(app.check_codelists(ctx["corrected"])) < len(app.check_codelists(ctx["xml"]))
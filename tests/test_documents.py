@@ -0,0 +1,37 @@
+import os
+
+from documents import HANDLE_RE, DocumentStore
+
+
+def stored(tmp_path, ttl=3600):
+    upload = tmp_path / "upload.pdf"
+    upload.write_bytes(b"%PDF-1.7")
+    store = DocumentStore(str(tmp_path / "documents"), ttl)
+    return store, store.put(str(upload), "<rsm:CrossIndustryInvoice/>", "Rechnung.pdf")
+
+
+def test_put_and_get(tmp_path):
+    store, handle = stored(tmp_path)
+    assert HANDLE_RE.match(handle)
+    document = store.get(handle)
+    assert document["xml"] == "<rsm:CrossIndustryInvoice/>"
+    assert document["filename"] == "Rechnung.pdf"
+    assert document["raw"] is False
+    with open(document["upload_path"], "rb") as f:
+        assert f.read() == b"%PDF-1.7"
+    assert not (tmp_path / "upload.pdf").exists()  # verschoben, nicht kopiert
+
+
+def test_invalid_or_unknown_handle(tmp_path):
+    store, handle = stored(tmp_path)
+    for candidate in (None, "", "../" + handle, handle[:-1], "B" * 22):
+        assert store.get(candidate) is None
+
+
+def test_expired_entries(tmp_path):
+    store, handle = stored(tmp_path, ttl=0)
+    assert store.get(handle) is None
+    path = os.path.join(store.directory, handle)
+    os.utime(path, (0, 0))
+    store.prune()
+    assert not os.path.exists(path)
@@ -0,0 +1,87 @@
+import io
+import re
+import zipfile
+
+import fitz  # PyMuPDF
+import pytest
+
+import app
+from conftest import write_pdf
+
+
+def raw_xml_pdf(path, xml):
+    """PDF mit der Rechnung nur als Roh-Stream in einem Objekt, ohne Anhang."""
+    doc = fitz.open()
+    doc.new_page()
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<<>>")
+    doc.update_stream(xref, xml.encode("utf-8"))
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def upload(client, path, mode):
+    with open(path, "rb") as f:
+        response = client.post("/", data={"pdf_file": (f, path.name), "mode": mode})
+    return response.status_code, response.get_data(as_text=True)
+
+
+def document_handle(html):
+    return re.search(r'name="doc" value="([A-Za-z0-9_-]{22})"', html).group(1)
+
+
+def corrected_pdf_xml(response):
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as zf:
+        pdf_bytes = zf.read(zf.namelist()[0])
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        assert [doc.embfile_info(i)["filename"] for i in range(doc.embfile_count())] == ["factur-x.xml"]
+        return doc.embfile_get(0).decode("utf-8")
+
+
+def test_repair_embeds_raw_xml(tmp_path, invoice_xml):
+    client = app.create_app({"DOCUMENT_DIR": str(tmp_path / "documents")}).test_client()
+    status, html = upload(client, raw_xml_pdf(tmp_path / "roh.pdf", invoice_xml), "full")
+    assert status == 200 and "Roh-XML" in html
+
+    response = client.post("/download_corrected", data={
+        "doc": document_handle(html), "correction": "EMBEDRAW|noembed|embed", "repair_embed": "yes"})
+    assert response.status_code == 200
+    assert corrected_pdf_xml(response) == invoice_xml
+
+
+def invalid_code_upload(tmp_path, invoice_xml, **config):
+    client = app.create_app({"DOCUMENT_DIR": str(tmp_path / "documents"), **config}).test_client()
+    xml = invoice_xml.replace("<ram:CategoryCode>S</ram:CategoryCode>", "<ram:CategoryCode>s</ram:CategoryCode>", 1)
+    pdf = write_pdf(tmp_path / "rechnung.pdf", xml)
+    status, html = upload(client, tmp_path / "rechnung.pdf", "standard")
+    assert status == 200
+    correction = re.search(r'<option value="(5305\|\d+\|\d+\|S)" selected>', html).group(1)
+    return client, pdf, xml, document_handle(html), correction
+
+
+def test_download_with_handle_matches_direct_correction(tmp_path, invoice_xml):
+    client, pdf, xml, handle, correction = invalid_code_upload(tmp_path, invoice_xml)
+    response = client.post("/download_corrected", data={"doc": handle, "corrections": correction})
+    assert response.status_code == 200
+
+    expected = app.write_corrected_pdf(pdf, xml, [correction], str(tmp_path / "direkt.pdf"))
+    assert corrected_pdf_xml(response) == expected
+    assert "<ram:CategoryCode>s</ram:CategoryCode>" not in expected
+
+
+@pytest.mark.parametrize("handle", ["A" * 22, "../../etc/passwd", ""])
+def test_download_with_unknown_handle(tmp_path, invoice_xml, handle):
+    client, _, _, _, correction = invalid_code_upload(tmp_path, invoice_xml)
+    with client.session_transaction() as session:
+        session.pop("document", None)
+    response = client.post("/download_corrected", data={"doc": handle, "corrections": correction})
+    assert response.status_code == 400
+    assert response.get_data(as_text=True).startswith("❌")
+
+
+def test_download_with_expired_handle(tmp_path, invoice_xml):
+    client, _, _, handle, correction = invalid_code_upload(tmp_path, invoice_xml, DOCUMENT_TTL=0)
+    response = client.post("/download_corrected", data={"doc": handle, "corrections": correction})
+    assert response.status_code == 400
+    assert response.get_data(as_text=True).startswith("❌")
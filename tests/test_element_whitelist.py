@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+from lxml import etree
+
+import app
+import element_whitelist
+from benchmarks.corpus import generate_invoice
+from element_whitelist import build_whitelist, find_nonstandard_elements, load_whitelists
+
+PREFIXES = {ns: prefix for prefix, ns in app.CII_NAMESPACES.items()}
+NOTE = "<ram:IncludedNote><ram:Content>Hinweis</ram:Content></ram:IncludedNote>"
+
+
+@pytest.fixture(scope="module")
+def whitelists():
+    return {profile: build_whitelist(app.profile_xsd_path(app.DEFAULT_XSD_ROOT, profile))
+            for profile in ("MINIMUM", "EN16931")}
+
+
+def nonstandard(xml, allowed):
+    return find_nonstandard_elements(etree.fromstring(xml.encode("utf-8")), allowed, PREFIXES)
+
+
+def test_standard_invoice_has_no_findings(whitelists, invoice_xml):
+    assert nonstandard(invoice_xml, whitelists["EN16931"]) == []
+
+
+def test_unknown_element_is_reported_once(whitelists, invoice_xml):
+    xml = invoice_xml.replace("<ram:TypeCode>380</ram:TypeCode>",
+                              "<ram:TypeCode>380</ram:TypeCode><ram:Foo><ram:Bar/></ram:Foo>", 1)
+    findings = nonstandard(xml, whitelists["EN16931"])
+    # Kinder eines unbekannten Elements werden nicht zusätzlich gemeldet
+    assert [f["path"] for f in findings] == ["/rsm:CrossIndustryInvoice/rsm:ExchangedDocument/ram:Foo"]
+    assert findings[0]["line"] == xml[:xml.index("<ram:Foo>")].count("\n") + 1
+
+
+def test_profile_specific_element(whitelists):
+    # IncludedNote ist erst ab BASIC WL erlaubt, nicht in MINIMUM
+    xml, _ = generate_invoice("MINIMUM", line_items=0)
+    xml = xml.replace("</rsm:ExchangedDocument>", NOTE + "</rsm:ExchangedDocument>", 1)
+    assert [f["path"] for f in nonstandard(xml, whitelists["MINIMUM"])] == [
+        "/rsm:CrossIndustryInvoice/rsm:ExchangedDocument/ram:IncludedNote"]
+    assert nonstandard(xml, whitelists["EN16931"]) == []
+
+
+def test_cache_reused_and_invalidated(tmp_path, monkeypatch):
+    source = app.profile_xsd_path(app.DEFAULT_XSD_ROOT, "MINIMUM")
+    schema_dir = tmp_path / "schema"
+    shutil.copytree(os.path.dirname(source), schema_dir, ignore=shutil.ignore_patterns("_XSLT_*"))
+    xsd_path = str(schema_dir / os.path.basename(source))
+    cache_dir = str(tmp_path / "cache")
+    built = []
+    real_build = element_whitelist.build_whitelist
+
+    def build(path):
+        built.append(path)
+        return real_build(path)
+
+    monkeypatch.setattr(element_whitelist, "build_whitelist", build)
+    first = load_whitelists({"MINIMUM": xsd_path}, cache_dir)["MINIMUM"]
+    assert os.path.exists(os.path.join(cache_dir, "element_whitelist_MINIMUM.json"))
+    assert load_whitelists({"MINIMUM": xsd_path}, cache_dir)["MINIMUM"] == first
+    assert len(built) == 1  # zweiter Aufruf aus dem Cache
+
+    # geändertes Begleit-XSD (Größe/mtime) → neuer Fingerprint → neu bauen
+    companion = next(p for p in schema_dir.glob("*.xsd") if p.name != os.path.basename(source))
+    companion.write_text(companion.read_text(encoding="utf-8") + "\n<!-- geändert -->\n", encoding="utf-8")
+    assert load_whitelists({"MINIMUM": xsd_path}, cache_dir)["MINIMUM"] == first
+    assert len(built) == 2
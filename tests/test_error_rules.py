@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+import app
+from error_rules import RuleContext, run_rules
+from format_router import SYNTAX_UNKNOWN
+
+UBL = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+       b'<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"/>')
+MALFORMED = b'<?xml version="1.0"?>\n<Rechnung><Kopf></Rechnung>'
+
+
+def upload(data, name, mode):
+    client = app.app.test_client()
+    response = client.post("/api/validate", data={"mode": mode, "pdf_file": (io.BytesIO(data), name)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_parse_error_and_unknown_syntax_are_rules():
+    ctx = RuleContext(xml="<a>", parse_error="Premature end of data", syntax=SYNTAX_UNKNOWN)
+    messages = [f["message"] for f in run_rules(ctx, "quick")]
+    assert messages == [
+        "E0053: Invalides XML.",
+        "E0053: Ungültiges XRechnungs-Format (Root-Tag fehlt).",
+        "E0054: Extrahiertes Objekt ist keine als XML klassifizierbare Datei (z.B. fehlendes End-Tag).",
+    ]
+
+
+@pytest.mark.parametrize("mode", ["quick", "full"])
+def test_malformed_upload(mode):
+    report = upload(MALFORMED, "rechnung.xml", mode)
+    assert report["fatal"] == "root"
+    assert report["error_reasons"] == [
+        "E0053: Invalides XML.",
+        "E0053: Ungültiges XRechnungs-Format (Root-Tag fehlt).",
+        "E0054: Extrahiertes Objekt ist keine als XML klassifizierbare Datei (z.B. fehlendes End-Tag).",
+    ]
+    assert not report["accepted"]
+
+
+@pytest.mark.parametrize("mode, peppol", [("quick", False), ("standard", True)])
+def test_ubl_upload(mode, peppol):
+    report = upload(UBL, "ubl.xml", mode)
+    assert report["syntax"] == "UBL-Invoice"
+    assert "E0053: Ungültiges XRechnungs-Format (Root-Tag fehlt)." in report["error_reasons"]
+    assert ("E0053: PEPPOL UBL-Format erkannt (nicht zulässig für XRechnung/Factur-X-Workflow)."
+            in report["error_reasons"]) == peppol
+    assert not report["accepted"]
+
+
+def test_ubl_rejection_skips_full_parse(tmp_path, monkeypatch):
+    # großes UBL-Dokument: die Ablehnung liest nur Prolog und Root-Tag
+    path = tmp_path / "ubl.xml"
+    path.write_bytes(UBL.replace(b"/>", b">" + b"<Note>x</Note>" * 200000 + b"</Invoice>"))
+    parsed = []
+    real_fromstring = app.etree.fromstring
+
+    def fromstring(data, *args, **kwargs):
+        parsed.append(len(data))
+        return real_fromstring(data, *args, **kwargs)
+
+    monkeypatch.setattr(app.etree, "fromstring", fromstring)
+    for mode in app.VALIDATION_MODES:
+        report = app.run_validation(str(path), False, mode)
+        assert report["fatal"] == "root"
+        assert "E0053: Ungültiges XRechnungs-Format (Root-Tag fehlt)." in report["error_reasons"]
+        assert "E0053: Invalides XML." not in report["error_reasons"]
+    assert parsed == []
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+import app
+from conftest import ROOT
+
+
+def run_golden_cli(corpus, budgets, seed, *args):
+    env = dict(os.environ, PYTHONHASHSEED=str(seed))
+    return subprocess.run([sys.executable, "-m", "benchmarks", "golden", str(corpus), "--budgets", str(budgets), *args],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+
+
+def test_suggest_code_prefers_longest_prefix():
+    assert app.suggest_code("Payment", "58x", {"5", "58", "1"}) == "58"
+    assert app.suggest_code("Payment", "58x", {"58", "5", "1"}) == "58"
+
+
+def test_golden_independent_of_hash_seed(tmp_path, invoice_xml):
+    # "58x" passt auf die Zahlungsart-Codes "5" und "58"; der Vorschlag darf nicht von der Set-Reihenfolge abhängen
+    corpus = tmp_path / "korpus"
+    corpus.mkdir()
+    (corpus / "zahlungsart.xml").write_text(
+        invoice_xml.replace("<ram:TypeCode>58</ram:TypeCode>", "<ram:TypeCode>58x</ram:TypeCode>"), encoding="utf-8")
+    budgets = tmp_path / "budgets.json"
+    budgets.write_text(json.dumps({"mode": "standard", "repeat": 1}), encoding="utf-8")
+
+    written = run_golden_cli(corpus, budgets, 1, "--update")
+    assert written.returncode == 0, written.stdout + written.stderr
+    with open(corpus / "golden" / "zahlungsart.xml.json", encoding="utf-8") as f:
+        codelist_errors = json.load(f)["report"]["codelist_errors"]
+    assert [(e["value"], e["suggestion"]) for e in codelist_errors] == [("58x", "58")]
+
+    for seed in (2, 3):
+        checked = run_golden_cli(corpus, budgets, seed)
+        assert checked.returncode == 0, checked.stdout + checked.stderr
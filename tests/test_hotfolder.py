@@ -0,0 +1,75 @@
+import fitz  # PyMuPDF
+
+import app
+from conftest import write_pdf
+from hotfolder import HotFolder
+
+
+def embedded_xml(path):
+    with fitz.open(path) as doc:
+        return doc.embfile_get(0).decode("utf-8")
+
+
+def run_hotfolder(tmp_path, xml):
+    in_dir, out_dir = tmp_path / "eingang", tmp_path / "ergebnis"
+    in_dir.mkdir()
+    write_pdf(in_dir / "rechnung.pdf", xml)
+    folder = HotFolder(str(in_dir), str(out_dir), mode="standard", correct=True, settle=0)
+    sha256 = app.file_sha256(str(in_dir / "rechnung.pdf"))
+    folder.process(sha256, "rechnung.pdf")
+    return folder.checkpoint.hashes[sha256], out_dir
+
+
+def test_correct_writes_suggested_code(tmp_path, invoice_xml):
+    # Kategorie "s" (klein) → Vorschlag "S"; "&amp;" im Namen darf nicht doppelt escaped werden
+    xml = (invoice_xml.replace("<ram:CategoryCode>S</ram:CategoryCode>", "<ram:CategoryCode>s</ram:CategoryCode>", 1)
+           .replace("Kunde GmbH", "Kunde &amp; Co GmbH"))
+    entry, out_dir = run_hotfolder(tmp_path, xml)
+
+    corrected = embedded_xml(out_dir / entry["corrected"])
+    assert "<ram:CategoryCode>s</ram:CategoryCode>" not in corrected
+    assert corrected == xml.replace("<ram:CategoryCode>s</ram:CategoryCode>", "<ram:CategoryCode>S</ram:CategoryCode>", 1)
+    assert app.check_codelists(corrected) == []
+
+
+def test_correct_skips_pdf_without_applicable_correction(tmp_path, invoice_xml):
+    entry, out_dir = run_hotfolder(tmp_path, invoice_xml)
+    assert "corrected" not in entry
+    assert not (out_dir / "corrected" / "rechnung_corrected.pdf").exists()
+
+
+def test_apply_corrections_keeps_namespace_prefixes(invoice_xml):
+    xml = invoice_xml.replace("<ram:InvoiceCurrencyCode>EUR<", "<ram:InvoiceCurrencyCode>EUX<")
+    finding, = app.check_codelists(xml)
+    corrected = app.apply_corrections(xml, [f"Currency|{finding['start']}|{finding['end']}|EUR"])
+    assert corrected == invoice_xml
+
+
+def test_failed_file_is_retried_not_checkpointed(tmp_path, invoice_xml, monkeypatch):
+    in_dir, out_dir = tmp_path / "eingang", tmp_path / "ergebnis"
+    in_dir.mkdir()
+    write_pdf(in_dir / "rechnung.pdf", invoice_xml)
+    folder = HotFolder(str(in_dir), str(out_dir), mode="quick", settle=0)
+    sha256, = folder.pending()
+
+    def broken(*args, **kwargs):
+        raise OSError("Platte voll")
+
+    monkeypatch.setattr(app, "run_validation", broken)
+    folder.process(sha256, "rechnung.pdf")
+    assert sha256 not in folder.checkpoint.hashes
+    failure = folder.checkpoint.failures[sha256]
+    assert (failure["error"], failure["attempts"]) == ("Platte voll", 1)
+    assert folder.pending() == {}  # Wartezeit bis zum nächsten Versuch
+
+    # Fehlschläge überleben einen Neustart
+    folder.checkpoint.save()
+    folder = HotFolder(str(in_dir), str(out_dir), mode="quick", settle=0)
+    assert folder.checkpoint.failures[sha256]["attempts"] == 1
+    folder.checkpoint.failures[sha256]["retry_at"] = 0
+
+    monkeypatch.undo()
+    assert folder.pending() == {sha256: "rechnung.pdf"}
+    folder.process(sha256, "rechnung.pdf")
+    assert folder.checkpoint.hashes[sha256]["accepted"] is not None
+    assert sha256 not in folder.checkpoint.failures
@@ -0,0 +1,28 @@
+import app
+import jobs
+
+
+class StuckQueue:
+    """Job bleibt für immer in "running" (z.B. Worker-Prozess gestorben)."""
+
+    def get(self, job_id):
+        return {"id": job_id, "status": jobs.STATUS_RUNNING, "stage": "xsd", "progress": None,
+                "result": None, "error": None, "filename": "x.xml", "mode": "quick", "created_at": 0.0, "started_at": 0.0, "finished_at": None}
+
+
+def test_event_stream_ends_after_max_seconds(monkeypatch):
+    monkeypatch.setenv("SOVALIDATOR_SSE_POLL", "0.01")
+    monkeypatch.setenv("SOVALIDATOR_SSE_MAX_SECONDS", "0.1")
+    monkeypatch.setattr(app, "get_job_queue", lambda: StuckQueue())
+    monkeypatch.setattr(app, "get_worker_pool", lambda: None)
+    body = app.app.test_client().get("/api/jobs/abc/events").get_data(as_text=True)
+    assert body.startswith("retry: 1000")
+    assert body.count("event: progress") == 1
+
+
+def test_job_depth_metric(tmp_path, monkeypatch):
+    queue = jobs.JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.submit("a" * 64, "quick", False, "x.xml", None, False)
+    monkeypatch.setattr(app, "get_job_queue", lambda: queue)
+    assert app.job_depth()[(jobs.STATUS_QUEUED,)] == 1
+    assert 'sovalidator_jobs{status="queued"} 1' in app.metrics.render_prometheus()
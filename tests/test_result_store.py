@@ -0,0 +1,83 @@
+import datetime
+
+import app
+import result_store
+from result_store import ResultStore, split_range
+
+
+def day(year, month, dom):
+    return (datetime.date(year, month, dom) - datetime.date(1970, 1, 1)).days
+
+
+def at(year, month, dom):
+    """Zeitstempel mittags UTC des Tages."""
+    return day(year, month, dom) * 86400 + 43200
+
+
+def report(seller="VA:DE1", codes=("Currency",), errors=()):
+    return {
+        "mode": "standard", "accepted": False, "fatal": None, "seller_id": seller, "profile": "EN16931",
+        "codelist_errors": [{"label": code, "value": "X"} for code in codes],
+        "error_findings": [{"code": code, "severity": "error", "message": code} for code in errors],
+        "schematron": [],
+    }
+
+
+def test_split_range_at_month_boundaries():
+    months, day_ranges = split_range(day(2026, 1, 20), day(2026, 4, 10))
+    assert months == [202602, 202603]
+    assert day_ranges == [(day(2026, 1, 20), day(2026, 1, 31)), (day(2026, 4, 1), day(2026, 4, 10))]
+    # ganzer Monat (Februar im Schaltjahr) ohne Randtage
+    assert split_range(day(2024, 2, 1), day(2024, 2, 29)) == ([202402], [])
+    # Monatsende als letzter Tag: kein voller Monat, nur Tagesbereich
+    assert split_range(day(2026, 3, 31), day(2026, 4, 1)) == (
+        [], [(day(2026, 3, 31), day(2026, 3, 31)), (day(2026, 4, 1), day(2026, 4, 1))])
+
+
+def test_split_range_empty():
+    assert split_range(day(2026, 3, 2), day(2026, 3, 1)) == ([], [])
+
+
+def test_top_errors_merges_monthly_and_daily_rollups(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    # Randtag im Januar, voller Februar, Randtag im März, außerhalb des Zeitraums im Dezember
+    store.record(report(), "a", "v1", now=at(2026, 1, 25))
+    store.record(report(errors=("E0070",)), "b", "v1", now=at(2026, 2, 10))
+    store.record(report(seller="VA:DE2"), "c", "v1", now=at(2026, 2, 28))
+    store.record(report(), "d", "v1", now=at(2026, 3, 5))
+    store.record(report(), "e", "v1", now=at(2025, 12, 31))
+    store.record(report(), "d", "v1", now=at(2026, 3, 5))  # gleiche Rechnung, nicht doppelt gezählt
+
+    now = at(2026, 3, 5)
+    days = day(2026, 3, 5) - day(2026, 1, 20) + 1
+    rows = store.top_errors(days, now=now)
+    assert rows == [
+        {"seller_id": "VA:DE1", "kind": "codelist", "code": "Currency", "count": 3},
+        {"seller_id": "VA:DE1", "kind": "errorcode", "code": "E0070", "count": 1},
+        {"seller_id": "VA:DE2", "kind": "codelist", "code": "Currency", "count": 1},
+    ]
+    assert store.top_errors(days, seller_id="VA:DE2", now=now) == [rows[2]]
+    assert store.top_errors(days, kind=result_store.KIND_ERRORCODE, now=now) == [rows[1]]
+
+
+def test_top_errors_empty_range(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.record(report(), "a", "v1", now=at(2026, 3, 5))
+    assert store.top_errors(0, now=at(2026, 3, 5)) == []
+
+
+def test_results_endpoints(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.record(report(errors=("E0070",)), "f" * 64, "v1")
+    monkeypatch.setattr(app, "get_result_store", lambda: store)
+    client = app.create_app({"RESULTS_TOKEN": "auswertung"}).test_client()
+    headers = {"Authorization": "Bearer auswertung"}
+
+    top = client.get("/api/results/top-errors?days=1&kind=errorcode", headers=headers).get_json()
+    assert top["days"] == 1
+    assert top["results"] == [{"seller_id": "VA:DE1", "kind": "errorcode", "code": "E0070", "count": 1}]
+
+    invoice = client.get("/api/results/invoice/" + "f" * 64, headers=headers).get_json()
+    validation, = invoice["validations"]
+    assert (validation["seller_id"], validation["mode"], validation["accepted"]) == ("VA:DE1", "standard", 0)
+    assert sorted(f["code"] for f in validation["findings"]) == ["Currency", "E0070"]
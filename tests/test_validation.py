@@ -0,0 +1,55 @@
+import app
+from conftest import write_pdf
+
+
+def codes(report):
+    return [finding["code"] for finding in report["error_findings"]]
+
+
+def test_valid_invoice_is_accepted(tmp_path, invoice_xml):
+    path = tmp_path / "inv.xml"
+    path.write_text(invoice_xml, encoding="utf-8")
+    report = app.run_validation(str(path), False, "quick")
+    assert report["fatal"] is None
+    assert report["xsd_ok"]
+
+
+def test_malformed_xml_reports_error_codes_in_every_mode(tmp_path, invoice_xml):
+    path = tmp_path / "broken.xml"
+    path.write_text(invoice_xml.replace("</rsm:ExchangedDocument>", "", 1), encoding="utf-8")
+    for mode in app.VALIDATION_MODES:
+        report = app.run_validation(str(path), False, mode)
+        assert report["fatal"] == "well_formed"
+        assert "E0053" in codes(report) and "E0054" in codes(report), mode
+        assert not report["accepted"]
+
+
+def test_malformed_embedded_xml_keeps_pdf_findings(tmp_path, invoice_xml):
+    broken = invoice_xml.replace("</rsm:ExchangedDocument>", "", 1)
+    path = write_pdf(tmp_path / "inv.pdf", broken, name="rechnung.xml")
+    report = app.run_validation(path, True, "quick")
+    assert report["fatal"] == "well_formed"
+    messages = report["error_reasons"]
+    assert any(m.startswith("E0051: Filename der eingebetteten Rechnung") for m in messages)
+    assert "E0054" in codes(report)
+
+
+def test_bom_prefixed_invoice_is_routed_as_cii(tmp_path, invoice_xml):
+    from format_router import SYNTAX_CII, classify_syntax
+    assert classify_syntax("\ufeff" + invoice_xml) == SYNTAX_CII
+    assert classify_syntax(b"\xef\xbb\xbf" + invoice_xml.encode("utf-8")) == SYNTAX_CII
+
+    xml_path = tmp_path / "bom.xml"
+    xml_path.write_bytes(b"\xef\xbb\xbf" + invoice_xml.encode("utf-8"))
+    pdf_path = tmp_path / "bom.pdf"
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    doc.new_page()
+    doc.embfile_add("factur-x.xml", b"\xef\xbb\xbf" + invoice_xml.encode("utf-8"), filename="factur-x.xml")
+    doc.save(str(pdf_path))
+    doc.close()
+    for path, is_pdf in ((xml_path, False), (pdf_path, True)):
+        report = app.run_validation(str(path), is_pdf, "standard")
+        assert report["syntax"] == SYNTAX_CII
+        assert report["fatal"] is None
+        assert "E0053" not in codes(report)